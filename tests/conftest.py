@@ -1,5 +1,8 @@
 import os
 
+import pytest
+from django.core.cache import cache
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +40,15 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Тест откатывается без фиксации, и сброс кеша по on_commit
+    # не срабатывает: страницы прошлого теста остались бы в кеше.
+    cache.clear()
+    yield
+    # Миниатюры после фиксации строятся в фоне: база и файлы теста
+    # не должны очищаться, пока они пишут.
+    from posts.thumbnails import wait_for_thumbnails
+    wait_for_thumbnails()
@@ -3,6 +3,7 @@ import tempfile
 import pytest
 from mixer.backend.django import mixer as _mixer
 from posts.models import Post, Group
+from posts.thumbnails import wait_for_thumbnails
 
 
 @pytest.fixture()
@@ -10,6 +11,9 @@ def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
         settings.MEDIA_ROOT = temp_directory
         yield temp_directory
+        # Фоновые миниатюры должны дописаться сюда, пока MEDIA_ROOT
+        # не вернулся к папке проекта.
+        wait_for_thumbnails()
 
 
 @pytest.fixture
@@ -0,0 +1,43 @@
+from posts.models import Post
+
+# Поля ответа и пути к ним для values(): связанные объекты отдаются
+# одним значением, без построения экземпляров моделей.
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+    "comments_count": "comments_count",
+}
+
+
+def parse_fields(param):
+    """
+    Поля из параметра fields=id,text,…; без параметра — все.
+    Неизвестное поле — ValueError.
+    """
+    if not param:
+        return list(POST_FIELDS)
+    names = [name.strip() for name in param.split(",") if name.strip()]
+    unknown = [name for name in names if name not in POST_FIELDS]
+    if unknown or not names:
+        raise ValueError(", ".join(unknown))
+    return names
+
+
+def post_values(queryset, names, ordering_fields):
+    """Строки-словари с выбранными полями и полями сортировки."""
+    paths = {POST_FIELDS[name] for name in names} | set(ordering_fields)
+    return queryset.values(*paths)
+
+
+def serialize_post(row, names):
+    data = {name: row[POST_FIELDS[name]] for name in names}
+    if data.get("image"):
+        storage = Post._meta.get_field("image").storage
+        data["image"] = storage.url(data["image"])
+    elif "image" in data:
+        data["image"] = None
+    return data
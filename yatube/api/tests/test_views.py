@@ -0,0 +1,167 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from core.tests.utils import run_on_commit
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiViewsTest.reader)
+        self.urls = (
+            reverse('api:index'),
+            reverse('api:group_list', args=[self.group.slug]),
+            reverse('api:profile', args=[self.author.username]),
+            reverse('api:follow_index'),
+        )
+
+    def get_json(self, url, client=None, **params):
+        response = (client or self.reader_client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    @override_settings(POST_COUNT=2)
+    def test_cursor_pages_cover_feed(self):
+        """Курсоры next проходят каждую ленту целиком без дублей."""
+        expected = [post.id for post in reversed(self.posts)]
+        for url in self.urls:
+            with self.subTest(url=url):
+                ids = []
+                data = self.get_json(url)
+                while True:
+                    ids.extend(post['id'] for post in data['results'])
+                    if not data['next']:
+                        break
+                    data = json.loads(self.reader_client.get(
+                        data['next']).content)
+                self.assertEqual(ids, expected)
+
+    def test_posts_not_instantiated(self):
+        """Ответ строится из values() без экземпляров Post."""
+        created = []
+
+        def count(sender, **kwargs):
+            created.append(sender)
+
+        post_init.connect(count, sender=Post)
+        try:
+            for url in self.urls:
+                self.get_json(url)
+        finally:
+            post_init.disconnect(count, sender=Post)
+        self.assertEqual(created, [])
+
+    def test_sparse_fields(self):
+        """fields= оставляет в ответе только выбранные поля."""
+        data = self.get_json(self.urls[0], fields='id,author')
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.posts[-1].id, 'author': self.author.username})
+        response = self.reader_client.get(self.urls[0], {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                with run_on_commit():
+                    Post.objects.create(author=self.author, text='Новый')
+                    # До фиксации версия ленты прежняя.
+                    response = self.reader_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_new_comment_changes_etag(self):
+        """comments_count в ответе — значит, и ETag зависит от него."""
+        url = self.urls[0] + '?fields=id,comments_count'
+        etag = self.reader_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.posts[-1], author=self.author, text='Комментарий')
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['results'][0]['comments_count'], 1)
+
+    def test_author_rename_changes_etag(self):
+        """Имя автора в ответе — значит, и ETag зависит от него."""
+        url = self.urls[0] + '?fields=id,author'
+        etag = self.reader_client.get(url)['ETag']
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        with run_on_commit():
+            author.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['results'][0]['author'], 'renamed')
+
+    def test_follow_feed_private(self):
+        """Лента подписок своя у каждого: общим кешам её хранить нельзя."""
+        for method in ('get', 'head'):
+            with self.subTest(method=method):
+                response = getattr(self.reader_client, method)(self.urls[3])
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_errors(self):
+        """Ошибки отдаются в JSON с подходящим статусом."""
+        cases = (
+            (self.client, reverse('api:follow_index'), 401),
+            (self.client, reverse('api:group_list', args=['none']), 404),
+            (self.client, reverse('api:profile', args=['none']), 404),
+            (self.client, self.urls[0] + '?cursor=broken', 400),
+        )
+        for client, url, status in cases:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_query_budget(self):
+        """Число запросов не зависит от размера страницы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                used = []
+                for page_size in (2, settings.POST_COUNT):
+                    with override_settings(POST_COUNT=page_size):
+                        with CaptureQueriesContext(connection) as queries:
+                            self.reader_client.get(url)
+                    used.append(len(queries))
+                self.assertEqual(used[0], used[1])
+                self.assertLessEqual(
+                    used[1], resolve(url).func.query_budget)
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from . import views
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", views.index, name="index"),
+    path("groups/<slug:slug>/posts/", views.group_posts, name="group_list"),
+    path(
+        "profiles/<str:username>/posts/",
+        views.profile,
+        name="profile",
+    ),
+    path("follow/posts/", views.follow_index, name="follow_index"),
+]
@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from core.cache_control import cache_for_anonymous
+from core.paginator import CursorPaginator
+from core.query_budget import query_budget
+from posts.etags import feed_version_etag
+from posts.feeds import TIMELINE_ORDERING, timeline_posts
+from posts.models import Follow, Group, Post, User
+
+from .serializers import parse_fields, post_values, serialize_post
+
+ORDERING = ("-pub_date", "-id")
+
+
+def error(detail, status):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+def feed_response(request, queryset, ordering=ORDERING):
+    """
+    Страница постов в JSON: поля из fields=, позиция из cursor=,
+    ссылки на соседние страницы в next и previous.
+    """
+    try:
+        names = parse_fields(request.GET.get("fields"))
+    except ValueError as e:
+        return error(f"Неизвестные поля: {e}", 400)
+    paginator = CursorPaginator(
+        post_values(queryset, names, [f.lstrip("-") for f in ordering]),
+        settings.POST_COUNT,
+        ordering=ordering,
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidPage as e:
+        return error(str(e), 400)
+
+    def link(cursor):
+        if not cursor:
+            return None
+        query = request.GET.copy()
+        query["cursor"] = cursor
+        return request.build_absolute_uri(f"?{query.urlencode()}")
+
+    return JsonResponse({
+        "results": [serialize_post(row, names) for row in page],
+        "next": link(page.has_next() and paginator.next_cursor),
+        "previous": link(page.has_previous() and paginator.previous_cursor),
+    })
+
+
+def feed_etag(request, *args, **kwargs):
+    return feed_version_etag(
+        request, "api", request.get_full_path(), args, kwargs)
+
+
+def follow_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    follows = Follow.objects.filter(user=request.user).aggregate(
+        Count("id"), Max("id"))
+    return feed_version_etag(
+        request, "api", request.get_full_path(), follows)
+
+
+@require_safe
+@query_budget(3)
+@cache_for_anonymous
+@condition(etag_func=feed_etag)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@query_budget(4)
+@cache_for_anonymous
+@condition(etag_func=feed_etag)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        "id", flat=True).first()
+    if group_id is None:
+        return error("Группа не найдена", 404)
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@require_safe
+@query_budget(4)
+@cache_for_anonymous
+@condition(etag_func=feed_etag)
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        "id", flat=True).first()
+    if author_id is None:
+        return error("Пользователь не найден", 404)
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@require_safe
+@query_budget(4)
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error("Нужна авторизация", 401)
+    return feed_response(
+        request, timeline_posts(request.user), ordering=TIMELINE_ORDERING)
@@ -0,0 +1,400 @@
+import atexit
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY, value INTEGER NOT NULL
+);
+"""
+
+LOG = "INSERT INTO changes (key) VALUES (?)"
+
+STATS = ("l1_hits", "l2_hits", "misses", "sets", "deletes")
+
+
+_temporary_dir = None
+
+
+def temporary_location():
+    """Файл кеша, который живёт не дольше процесса."""
+    global _temporary_dir
+    if _temporary_dir is None:
+        _temporary_dir = tempfile.mkdtemp(prefix="yatube-cache-")
+        atexit.register(shutil.rmtree, _temporary_dir, True)
+    return os.path.join(_temporary_dir, "cache.sqlite3")
+
+
+class LRU:
+    """Ограниченный словарь процесса: при переполнении вытесняет самый
+    давно читанный ключ."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= now:
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кеш: L1 — LRU в памяти процесса, L2 — файл SQLite,
+    общий для всех воркеров.
+
+    Каждая запись в L2 добавляет ключ в журнал изменений с растущим
+    номером. Процесс не чаще раза в SYNC_INTERVAL секунд читает журнал
+    после последнего виденного номера и выбрасывает из L1 изменённые
+    чужими процессами ключи, поэтому запись или clear() в одном
+    воркере видны остальным. Срок жизни записи в L1 дополнительно
+    ограничен L1_TIMEOUT.
+
+    Счётчики попаданий копятся в процессе и при синхронизации
+    складываются в таблицу stats (см. команду cache_stats).
+
+    Кеш хранит id записей базы DATABASE. Если это база SQLite в памяти
+    (тестовая), общий файл не используется: L2 переезжает во временный
+    файл процесса, чтобы прогон тестов не смешивал свои ключи с
+    рабочими и не стирал их.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.path = location
+        self.l1 = LRU(options.get("L1_MAX_ENTRIES", 1000))
+        self.l1_timeout = options.get("L1_TIMEOUT", 60)
+        self.sync_interval = options.get("SYNC_INTERVAL", 1)
+        self.log_size = options.get("LOG_SIZE", 10000)
+        self.database = options.get("DATABASE")
+        self.active_path = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.seen = None
+        self.synced = 0
+        self.own = set()
+        self.counts = Counter()
+        self.writes = 0
+
+    def location(self):
+        if self.database is not None:
+            connection = connections[self.database]
+            if connection.vendor == "sqlite" and connection.is_in_memory_db():
+                return temporary_location()
+        return self.path
+
+    def switch(self, path):
+        """Другой файл — другие данные: L1 и журнал начинаются заново."""
+        with self.lock:
+            if self.active_path != path:
+                if self.active_path is not None:
+                    self.l1.clear()
+                    self.seen = None
+                self.active_path = path
+
+    @property
+    def db(self):
+        """Соединение потока; после fork открывается заново."""
+        pid, path = os.getpid(), self.location()
+        if getattr(self.local, "key", None) != (pid, path):
+            self.switch(path)
+            db = sqlite3.connect(
+                path, timeout=5, isolation_level=None,
+                check_same_thread=False)
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            db.executescript(SCHEMA)
+            self.local.db, self.local.key = db, (pid, path)
+        return self.local.db
+
+    def write(self, statements):
+        """Выполняет изменения одной транзакцией, возвращает последний
+        номер журнала."""
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                db.executemany(sql, params)
+            seq = db.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+            ).fetchone()
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return seq[0] if seq else 0
+
+    def log(self, keys):
+        return LOG, [(key,) for key in keys]
+
+    def record(self, first, last):
+        """Свои записи не вытесняют L1 при следующей синхронизации."""
+        with self.lock:
+            self.own.update(range(first, last + 1))
+
+    def sync(self, now):
+        if now - self.synced < self.sync_interval:
+            return
+        with self.lock:
+            if now - self.synced < self.sync_interval:
+                return
+            self.synced = now
+            counts, self.counts = self.counts, Counter()
+            own, self.own = self.own, set()
+        db = self.db
+        if counts:
+            db.executemany(
+                "INSERT INTO stats (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + "
+                "excluded.value",
+                counts.items())
+        if self.seen is None:
+            row = db.execute("SELECT MAX(seq) FROM changes").fetchone()
+            self.seen = row[0] or 0
+            return
+        rows = db.execute(
+            "SELECT seq, key FROM changes WHERE seq > ? ORDER BY seq",
+            (self.seen,)).fetchall()
+        if not rows:
+            return
+        oldest = db.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if oldest > self.seen + 1 or any(
+                key is None and seq not in own for seq, key in rows):
+            self.l1.clear()
+        else:
+            self.l1.discard(
+                key for seq, key in rows if seq not in own)
+        self.seen = rows[-1][0]
+
+    def l1_expiry(self, expires, now):
+        limit = now + self.l1_timeout
+        return limit if expires is None else min(expires, limit)
+
+    def make_keys(self, keys, version):
+        made = {}
+        for key in keys:
+            made[self.make_key(key, version=version)] = key
+        for key in made:
+            self.validate_key(key)
+        return made
+
+    def get_many(self, keys, version=None):
+        now = time.time()
+        self.sync(now)
+        made = self.make_keys(keys, version)
+        found, missing = {}, []
+        for key in made:
+            value = self.l1.get(key, now)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.counts["l1_hits"] += len(found)
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            rows = self.db.execute(
+                f"SELECT key, value, expires FROM cache "
+                f"WHERE key IN ({placeholders}) "
+                f"AND (expires IS NULL OR expires > ?)",
+                (*missing, now)).fetchall()
+            for key, value, expires in rows:
+                self.l1.set(key, value, self.l1_expiry(expires, now))
+                found[key] = value
+            self.counts["l2_hits"] += len(rows)
+            self.counts["misses"] += len(missing) - len(rows)
+        return {made[key]: pickle.loads(value)
+                for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        values = self.get_many([key], version=version)
+        return values.get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self.make_key(key, version=version),
+             pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            for key, value in data.items()
+        ]
+        for key, _, _ in rows:
+            self.validate_key(key)
+        if not rows:
+            return []
+        last = self.write([
+            ("INSERT OR REPLACE INTO cache (key, value, expires) "
+             "VALUES (?, ?, ?)", rows),
+            self.log(key for key, _, _ in rows),
+        ])
+        self.record(last - len(rows) + 1, last)
+        for key, value, _ in rows:
+            self.l1.set(key, value, self.l1_expiry(expires, now))
+        self.counts["sets"] += len(rows)
+        self.cull(len(rows))
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                (key, time.time()))
+            added = db.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 expires)).rowcount
+            if added:
+                db.execute(LOG, (key,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if added:
+            self.l1.discard([key])
+        return bool(added)
+
+    def delete_many(self, keys, version=None):
+        made = list(self.make_keys(keys, version))
+        if not made:
+            return
+        self.write([
+            ("DELETE FROM cache WHERE key = ?", [(key,) for key in made]),
+            self.log(made),
+        ])
+        self.l1.discard(made)
+        self.counts["deletes"] += len(made)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        touched = self.db.execute(
+            "UPDATE cache SET expires = ? WHERE key = ?",
+            (self.get_backend_timeout(timeout), key)).rowcount
+        self.l1.discard([key])
+        return touched > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key))
+            db.execute(LOG, (key,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        self.l1.discard([key])
+        return value
+
+    def clear(self):
+        self.write([
+            ("DELETE FROM cache", [()]),
+            (LOG, [(None,)]),
+        ])
+        self.l1.clear()
+
+    def cull(self, written):
+        """
+        Раз в max_entries / 10 записей удаляет просроченное, а если
+        записей всё ещё больше max_entries — каждую cull_frequency-ю
+        из самых старых. Заодно укорачивает журнал изменений.
+        """
+        self.writes += written
+        if self.writes < max(self._max_entries // 10, 1):
+            return
+        self.writes = 0
+        db = self.db
+        db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        count = db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache "
+                "ORDER BY rowid LIMIT ?)",
+                (count // self._cull_frequency,))
+        db.execute(
+            "DELETE FROM changes WHERE seq <= "
+            "(SELECT MAX(seq) FROM changes) - ?",
+            (self.log_size,))
+
+    def stats(self):
+        """Счётчики всех процессов; несинхронизированные — свои."""
+        totals = dict.fromkeys(STATS, 0)
+        totals.update(self.db.execute("SELECT name, value FROM stats"))
+        for name, value in self.counts.items():
+            totals[name] += value
+        lookups = totals["l1_hits"] + totals["l2_hits"] + totals["misses"]
+        hits = lookups - totals["misses"]
+        totals["hit_rate"] = hits / lookups if lookups else 0
+        return totals
+
+    def reset_stats(self):
+        self.db.execute("DELETE FROM stats")
+        self.counts.clear()
+
+    def close(self, **kwargs):
+        """Соединение с SQLite держится всё время жизни потока."""
@@ -0,0 +1,24 @@
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+
+def cache_for_anonymous(view):
+    """
+    Анонимные страницы можно хранить браузеру и обратному прокси
+    ANONYMOUS_CACHE_MAX_AGE секунд. Страницы пользователя хранит только
+    браузер и перепроверяет их по ETag при каждом запросе.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response, public=True,
+                max_age=settings.ANONYMOUS_CACHE_MAX_AGE)
+        patch_vary_headers(response, ("Cookie",))
+        return response
+    return wrapper
@@ -0,0 +1,122 @@
+import re
+
+BANNER_RE = re.compile(r"/\*!.*?\*/", re.S)
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+TOKEN_RE = re.compile(r"[A-Za-z0-9_-]+")
+CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][_a-zA-Z0-9-]*)")
+# Классы внутри :not() и [атрибутов] не обязаны встречаться в разметке.
+IGNORED_RE = re.compile(r":not\([^)]*\)|\[[^\]]*\]")
+
+# Классы, которые bootstrap.bundle.js добавляет элементам на лету.
+SAFELIST = frozenset({
+    "active", "show", "showing", "hiding", "fade", "collapse",
+    "collapsing", "disabled", "modal-open", "modal-backdrop",
+    "carousel-item-next", "carousel-item-prev", "carousel-item-start",
+    "carousel-item-end", "pointer-event", "was-validated", "is-valid",
+    "is-invalid",
+})
+
+
+def used_tokens(texts):
+    """
+    Все слова, похожие на CSS-классы, из шаблонов: и атрибуты class,
+    и аргументы фильтра addclass, и имена внутри {% if %}.
+    """
+    tokens = set(SAFELIST)
+    for text in texts:
+        tokens.update(TOKEN_RE.findall(text))
+    return tokens
+
+
+def split_rules(css):
+    """
+    Правила верхнего уровня: пары (prelude, body), для @charset и
+    других правил без блока body равно None.
+    """
+    rules = []
+    depth = 0
+    start = body_start = 0
+    quote = None
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != "\\":
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            if depth == 0:
+                body_start = i + 1
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((css[start:body_start - 1].strip(),
+                              css[body_start:i]))
+                start = i + 1
+        elif char == ";" and depth == 0:
+            rules.append((css[start:i + 1].strip(), None))
+            start = i + 1
+    return rules
+
+
+def split_selectors(prelude):
+    selectors = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(prelude):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def selector_used(selector, tokens):
+    classes = CLASS_RE.findall(IGNORED_RE.sub("", selector))
+    return all(name in tokens for name in classes)
+
+
+def _purge(css, tokens):
+    output = []
+    for prelude, body in split_rules(css):
+        if body is None:
+            output.append(prelude)
+        elif prelude.startswith(("@media", "@supports")):
+            inner = _purge(body, tokens)
+            if inner:
+                output.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            output.append(f"{prelude}{{{body}}}")
+        else:
+            selectors = [
+                selector for selector in split_selectors(prelude)
+                if selector_used(selector, tokens)
+            ]
+            if selectors:
+                output.append(f"{','.join(selectors)}{{{body}}}")
+    return "".join(output)
+
+
+def purge_css(css, tokens, inline=False):
+    """
+    Оставляет в таблице стилей только правила, все классы которых
+    встречаются среди tokens. Лицензионный комментарий /*! */
+    сохраняется; для встраивания в <style> (inline) он и @charset
+    не нужны.
+    """
+    banner = BANNER_RE.search(css)
+    purged = _purge(COMMENT_RE.sub("", css), tokens)
+    charset, _, rest = purged.partition(";")
+    if not charset.startswith("@charset"):
+        charset, rest = "", purged
+    else:
+        charset += ";"
+    if inline:
+        return rest
+    if banner:
+        return charset + banner.group() + rest
+    return purged
@@ -0,0 +1,18 @@
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Настраивает каждое новое соединение с SQLite: WAL позволяет
+    читать во время записи, busy_timeout — ждать блокировку вместо
+    ошибки «database is locked».
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE post (
+    id INTEGER PRIMARY KEY,
+    author_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    pub_date REAL NOT NULL
+);
+CREATE INDEX post_author_date ON post (author_id, pub_date DESC);
+"""
+
+
+def connect(path, pragmas):
+    # Как Django: autocommit и таймаут модуля sqlite3 по умолчанию —
+    # 5 секунд ожидания блокировки даже без PRAGMA busy_timeout.
+    connection = sqlite3.connect(path, isolation_level=None)
+    cursor = connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    return connection
+
+
+def seed(path, rows):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    connection.executemany(
+        "INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)",
+        ((i % 100, "x" * 200, time.time()) for i in range(rows)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def run_worker(path, pragmas, seconds, write_share):
+    """Чтения страниц и записи постов в течение seconds секунд."""
+    connection = connect(path, pragmas)
+    reads = writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        author_id = random.randrange(100)
+        try:
+            if random.random() < write_share:
+                connection.execute("BEGIN")
+                connection.execute(
+                    "INSERT INTO post (author_id, text, pub_date) "
+                    "VALUES (?, ?, ?)",
+                    (author_id, "x" * 200, time.time()),
+                )
+                connection.execute("COMMIT")
+                writes += 1
+            else:
+                connection.execute(
+                    "SELECT id, text FROM post WHERE author_id = ? "
+                    "ORDER BY pub_date DESC LIMIT 10",
+                    (author_id,),
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            errors += 1
+    connection.close()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность SQLite с журналом отката "
+        "(без PRAGMA, но с 5-секундным ожиданием блокировки модуля "
+        "sqlite3) и с SQLITE_PRAGMAS при разном числе процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", default="1,2,4,8")
+        parser.add_argument("--seconds", type=float, default=3)
+        parser.add_argument("--rows", type=int, default=50000)
+        parser.add_argument("--write-share", type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        worker_counts = [int(n) for n in options["workers"].split(",")]
+        profiles = {
+            "rollback": {},
+            "tuned": settings.SQLITE_PRAGMAS,
+        }
+        context = multiprocessing.get_context("spawn")
+        for name, pragmas in profiles.items():
+            for workers in worker_counts:
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, "bench.sqlite3")
+                    seed(path, options["rows"])
+                    connect(path, pragmas).close()
+                    with context.Pool(workers) as pool:
+                        results = pool.starmap(run_worker, [(
+                            path, pragmas, options["seconds"],
+                            options["write_share"],
+                        )] * workers)
+                reads, writes, errors = map(sum, zip(*results))
+                seconds = options["seconds"]
+                self.stdout.write(
+                    f"{name:>8}, процессов {workers}: "
+                    f"чтений {reads / seconds:.0f}/с, "
+                    f"записей {writes / seconds:.0f}/с, "
+                    f"ошибок блокировки {errors}"
+                )
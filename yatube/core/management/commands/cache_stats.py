@@ -0,0 +1,24 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import STATS
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания в кеш по всем воркерам."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", default="default")
+        parser.add_argument("--reset", action="store_true")
+
+    def handle(self, *args, **options):
+        cache = caches[options["alias"]]
+        if not hasattr(cache, "stats"):
+            raise CommandError(f"Кеш {options['alias']} не ведёт статистику")
+        if options["reset"]:
+            cache.reset_stats()
+            return
+        stats = cache.stats()
+        for name in STATS:
+            self.stdout.write(f"{name}: {stats[name]}")
+        self.stdout.write(f"hit_rate: {stats['hit_rate']:.1%}")
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from core.css import purge_css, used_tokens
+
+# Шаблоны, из которых состоит первый экран любой страницы.
+CRITICAL_TEMPLATES = ("base.html", "includes/header.html")
+
+
+class Command(BaseCommand):
+    help = (
+        "Оставляет в Bootstrap только классы, которые используют шаблоны, "
+        "и готовит критический CSS для встраивания в base.html."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default="css/bootstrap.min.css")
+        parser.add_argument("--output", default="css/bootstrap.purged.css")
+        parser.add_argument(
+            "--critical", default="includes/critical_css.html")
+
+    def handle(self, *args, **options):
+        source = finders.find(options["source"])
+        if source is None:
+            raise CommandError(f"Не найден файл {options['source']}")
+        css = Path(source).read_text(encoding="utf-8")
+        template_dir = Path(settings.TEMPLATES[0]["DIRS"][0])
+        templates = {
+            path.relative_to(template_dir).as_posix():
+                path.read_text(encoding="utf-8")
+            for path in sorted(template_dir.glob("**/*.html"))
+        }
+        templates.pop(options["critical"], None)
+
+        purged = purge_css(css, used_tokens(templates.values()))
+        output = Path(settings.STATICFILES_DIRS[0], options["output"])
+        output.write_text(purged, encoding="utf-8")
+
+        critical = purge_css(css, used_tokens(
+            templates[name] for name in CRITICAL_TEMPLATES), inline=True)
+        Path(template_dir, options["critical"]).write_text(
+            "{% verbatim %}<style>" + critical + "</style>{% endverbatim %}\n",
+            encoding="utf-8",
+        )
+        self.stdout.write(
+            f"{options['output']}: {len(css)} → {len(purged)} байт, "
+            f"критический CSS: {len(critical)} байт. "
+            "Хеш в имени добавит collectstatic."
+        )
@@ -0,0 +1,33 @@
+def parse_accept_encoding(header):
+    """
+    Кодировки из Accept-Encoding с их q: {"gzip": 1.0, "br": 0.5}.
+    Запись с некорректным q считается неприемлемой (q=0).
+    """
+    codings = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings
+
+
+def accepts_gzip(request):
+    """
+    Принимает ли клиент gzip: явно с q > 0 или через «*». gzip;q=0
+    означает отказ, а не согласие.
+    """
+    codings = parse_accept_encoding(
+        request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    for coding in ("gzip", "x-gzip"):
+        if coding in codings:
+            return codings[coding] > 0
+    return codings.get("*", 0) > 0
@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import (cc_delim_re, get_conditional_response,
+                                patch_vary_headers)
+from django.utils.text import compress_string
+from django.utils.translation import get_language
+
+from .negotiation import accepts_gzip
+from .surrogate import HEADER, is_current, purged_since, tag_versions
+
+# Ответ с такими Vary одинаков для всех анонимных читателей: cookie
+# сессии и сообщений у них нет, сжатие и язык учитываются отдельно.
+SAFE_VARY = {"cookie", "accept-encoding", "accept-language"}
+MIN_COMPRESS_SIZE = 200
+
+
+def is_anonymous(request):
+    """
+    Без cookie сессии пользователь анонимный: проверка не обращается
+    ни к сессии, ни к базе.
+    """
+    return not (
+        settings.SESSION_COOKIE_NAME in request.COOKIES
+        or CookieStorage.cookie_name in request.COOKIES
+        or "HTTP_AUTHORIZATION" in request.META
+    )
+
+
+def is_cached_view(request):
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return False
+    return match.view_name in settings.PAGE_CACHE_VIEWS
+
+
+def page_key(request):
+    """
+    Ключ из адреса страницы и параметров PAGE_CACHE_PARAMS в порядке
+    сортировки. С посторонним или повторённым параметром запрос
+    не кешируется (None): иначе любая строка запроса была бы новым
+    ключом.
+    """
+    params = request.GET
+    if any(name not in settings.PAGE_CACHE_PARAMS
+           or len(params.getlist(name)) > 1 for name in params):
+        return None
+    query = urlencode(sorted(params.items()))
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    digest = hashlib.md5(f"{get_language()}:{url}".encode()).hexdigest()
+    return f"page:{digest}"
+
+
+def is_cacheable(request, response):
+    if response.status_code != 200 or response.streaming:
+        return False
+    if response.cookies or request.META.get("CSRF_COOKIE_USED"):
+        return False
+    if response.has_header("Content-Encoding"):
+        return False
+    cache_control = response.get("Cache-Control", "").lower()
+    if any(directive in cache_control
+           for directive in ("private", "no-store", "no-cache")):
+        return False
+    vary = {
+        header.lower()
+        for header in cc_delim_re.split(response.get("Vary", "")) if header
+    }
+    return vary <= SAFE_VARY
+
+
+def store(key, response, started):
+    """
+    Сохраняет страницу с версиями её меток. Если метку сбросили после
+    started — начала запроса, — страница могла прочитать данные ещё до
+    изменения: такая не сохраняется.
+    """
+    versions = tag_versions(response.get(HEADER, "").split())
+    if purged_since(versions, started):
+        return False
+    body = response.content
+    compressed = len(body) >= MIN_COMPRESS_SIZE
+    if compressed:
+        body = compress_string(body)
+    headers = [
+        (name, value) for name, value in response.items()
+        if name.lower() not in ("content-length", "vary")
+    ]
+    cache.set(key, {
+        "headers": headers,
+        "body": body,
+        "gzip": compressed,
+        "tags": versions,
+    }, settings.PAGE_CACHE_TIMEOUT)
+    return True
+
+
+def restore(request, entry):
+    body = entry["body"]
+    encoded = entry["gzip"] and accepts_gzip(request)
+    if entry["gzip"] and not encoded:
+        body = gzip.decompress(body)
+    response = HttpResponse(body)
+    for name, value in entry["headers"]:
+        response[name] = value
+    if encoded:
+        response["Content-Encoding"] = "gzip"
+    response["Content-Length"] = str(len(body))
+    patch_vary_headers(response, ("Cookie", "Accept-Encoding"))
+    return response
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Кеш готовых страниц для анонимных GET-запросов к PAGE_CACHE_VIEWS.
+
+    Стоит перед сессиями, аутентификацией и CSRF: попадание отдаётся
+    из кеша без них и без запросов к базе. Тело хранится сжатым gzip
+    и отдаётся как есть, если клиент его принимает.
+
+    Страница хранится с версиями меток из заголовка Surrogate-Key
+    и перестаёт отдаваться, как только сигналы сбросят любую из них
+    (core.surrogate.purge). Страница, метку которой сбросили во время
+    отрисовки, не сохраняется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method not in ("GET", "HEAD")
+                or not settings.PAGE_CACHE_TIMEOUT
+                or not is_anonymous(request)
+                or not is_cached_view(request)):
+            return self.get_response(request)
+        key = page_key(request)
+        if key is None:
+            return self.get_response(request)
+
+        entry = cache.get(key)
+        if entry is not None and is_current(entry["tags"]):
+            response = restore(request, entry)
+            response["X-Page-Cache"] = "hit"
+            return get_conditional_response(
+                request, etag=response.get("ETag"), response=response)
+
+        started = time.time()
+        response = self.get_response(request)
+        if request.method == "GET" and is_cacheable(request, response):
+            store(key, response, started)
+            response["X-Page-Cache"] = "miss"
+        return response
@@ -0,0 +1,167 @@
+import base64
+import datetime
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+AFTER = "a"
+BEFORE = "b"
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды, иначе курсор пропустит соседние записи."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу (keyset): страница выбирается условием
+    WHERE по полям сортировки, а не OFFSET, и общее количество
+    записей не считается.
+
+    Позиция передаётся непрозрачным токеном (next_cursor,
+    previous_cursor), поэтому глубокие страницы стоят столько же,
+    сколько первая.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=("-pub_date", "-id")):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._has_next = False
+        self._number = 1
+        self._rows = []
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    @property
+    def count(self):
+        """Нижняя граница количества записей, без COUNT(*)."""
+        return (
+            (self._number - 1) * self.per_page
+            + len(self._rows)
+            + int(self._has_next)
+        )
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    def encode_cursor(self, direction, obj, number):
+        if isinstance(obj, dict):
+            values = [obj[field] for field in self.fields]
+        else:
+            values = [getattr(obj, field) for field in self.fields]
+        raw = json.dumps([direction, number, values], cls=CursorEncoder)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, number, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (AFTER, BEFORE):
+                raise ValueError
+            if len(values) != len(self.fields):
+                raise ValueError
+            values = [
+                self._field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+            return direction, max(int(number), 1), values
+        except Exception:
+            raise InvalidPage("Некорректный курсор")
+
+    def position(self, cursor):
+        """
+        Разобранный токен для ключа кеша, без запросов: разные записи
+        одного курсора дают одну позицию, некорректный — как первая
+        страница (get_page отдаёт её же).
+        """
+        if cursor:
+            try:
+                return self.decode_cursor(cursor)
+            except InvalidPage:
+                pass
+        return AFTER, 1, None
+
+    def _field(self, name):
+        """Поле модели или аннотации, по которому идёт сортировка."""
+        annotation = self.object_list.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.object_list.model._meta.get_field(name)
+
+    def _seek(self, values, reverse):
+        """
+        Условие «строго после позиции» для составного ключа. Нестрогая
+        граница по первому полю вынесена отдельно, чтобы СУБД начала
+        чтение индекса с позиции, а не с его начала.
+        """
+        condition = Q()
+        lookups = []
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith("-") != reverse
+            lookups.append("lt" if descending else "gt")
+            step = Q(**{f"{self.fields[i]}__{lookups[i]}": values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        bound = Q(**{f"{self.fields[0]}__{lookups[0]}e": values[0]})
+        return bound & condition
+
+    def fetch(self, values, reverse):
+        """
+        До per_page + 1 записей после позиции values (при reverse — до
+        неё, в обратном порядке).
+        """
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        if reverse:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def page(self, cursor=None):
+        """Возвращает страницу для токена; без токена — первую."""
+        direction, number, values = AFTER, 1, None
+        if cursor:
+            direction, number, values = self.decode_cursor(cursor)
+        reverse = direction == BEFORE
+        rows = self.fetch(values, reverse)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_previous, self._has_next = has_more, True
+        else:
+            has_previous, self._has_next = values is not None, has_more
+
+        if not has_previous:
+            number = 1
+        elif number < 2:
+            number = 2
+        self._number = number
+        self._rows = rows
+
+        if rows and self._has_next:
+            self.next_cursor = self.encode_cursor(AFTER, rows[-1], number + 1)
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(
+                BEFORE, rows[0], number - 1)
+        return self._get_page(rows, number, self)
+
+    def get_page(self, cursor):
+        """Как page(), но на некорректный токен отдаёт первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidPage:
+            return self.page()
@@ -0,0 +1,10 @@
+def query_budget(limit):
+    """
+    Объявляет бюджет SQL-запросов view: столько запросов, включая
+    сессию и пользователя, выполняет запрос авторизованного
+    пользователя при любом размере страницы. Бюджет проверяют тесты.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
@@ -0,0 +1,13 @@
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from .writes import write
+
+
+class SessionStore(DBStore):
+    """Сессии в БД, запись которых идёт через писателя процесса."""
+
+    def save(self, must_create=False):
+        write(super().save, must_create)
+
+    def delete(self, session_key=None):
+        write(super().delete, session_key)
@@ -0,0 +1,121 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .surrogate import (STALE, collect_tags, is_current, note_tags,
+                        tag_versions)
+
+LOCK_SUFFIX = ":lock"
+
+
+def should_refresh(entry, now, beta):
+    """
+    Вероятностное раннее обновление (XFetch): чем ближе срок и чем
+    дольше считалось значение, тем вероятнее, что очередной читатель
+    пересчитает его заранее, а не все разом в момент истечения.
+    """
+    early = entry["delta"] * beta * -math.log(1 - random.random())
+    return now + early >= entry["expires"]
+
+
+def acquire(key):
+    return cache.add(key + LOCK_SUFFIX, 1, settings.STAMPEDE_LOCK_TIMEOUT)
+
+
+def release(key):
+    cache.delete(key + LOCK_SUFFIX)
+
+
+def recompute(key, compute, timeout, versions):
+    try:
+        started = time.monotonic()
+        with collect_tags() as found:
+            value = compute()
+        delta = time.monotonic() - started
+        if STALE in found.values():
+            # Данные прочитаны до сброса меток: значение не сохраняется.
+            return value
+        if timeout is None:
+            expires, hard_timeout = math.inf, None
+        else:
+            expires = time.time() + timeout
+            hard_timeout = timeout + settings.STAMPEDE_STALE_TIMEOUT
+        cache.set(key, {
+            "value": value,
+            "expires": expires,
+            "delta": delta,
+            "tags": {**found, **versions},
+        }, hard_timeout)
+        return value
+    finally:
+        release(key)
+
+
+def current(entry, versions):
+    """
+    Запись с устаревшей меткой не отдаётся даже как старая: метки
+    tags сверяются с versions, отмеченные при отрисовке — с кешем.
+    """
+    if entry is None:
+        return None
+    stored = entry.get("tags", {})
+    if any(stored.get(tag) != version for tag, version in versions.items()):
+        return None
+    found = {tag: version for tag, version in stored.items()
+             if tag not in versions}
+    if found and not is_current(found):
+        return None
+    return entry
+
+
+def hit(entry):
+    """Значение записи; её метки достаются и внешним collect_tags."""
+    note_tags(entry["tags"])
+    return entry["value"]
+
+
+def wait_for(key, versions):
+    """Ждёт, пока значение посчитает владелец блокировки."""
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = current(cache.get(key), versions)
+        if entry is not None:
+            return entry
+    return None
+
+
+def get_or_compute(key, compute, timeout, beta=None, tags=()):
+    """
+    Значение из кеша по ключу key; при промахе считается compute().
+
+    Истёкшее значение ещё STAMPEDE_STALE_TIMEOUT секунд отдаётся как
+    есть, пока его пересчитывает один вызывающий — тот, кто первым
+    взял блокировку. При холодном промахе остальные недолго ждут его
+    результата и только потом считают сами.
+
+    Значение, помеченное метками tags (core.surrogate), после purge()
+    любой из них считается промахом. Метки, отмеченные при вычислении
+    через note_tags, хранятся вместе со значением и сбрасывают его так
+    же: так ключу не нужно зависеть от данных, которые ещё не прочитаны.
+    Значение, при вычислении которого метку отметили как STALE
+    (core.surrogate.note_read), не сохраняется.
+    """
+    beta = settings.STAMPEDE_BETA if beta is None else beta
+    versions = tag_versions(tags)
+    entry = current(cache.get(key), versions)
+    if entry is not None:
+        if not should_refresh(entry, time.time(), beta):
+            return hit(entry)
+        if acquire(key):
+            return recompute(key, compute, timeout, versions)
+        return hit(entry)
+    if acquire(key):
+        return recompute(key, compute, timeout, versions)
+    entry = wait_for(key, versions)
+    if entry is not None:
+        return hit(entry)
+    return compute()
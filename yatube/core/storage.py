@@ -0,0 +1,51 @@
+import gzip
+import io
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+# Бинарные форматы (png, jpg, woff2) уже сжаты, gzip их не уменьшит.
+COMPRESSIBLE = (".css", ".js", ".svg", ".ico", ".map", ".json", ".txt")
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хешем содержимого в имени (css/bootstrap.min.4f1c….css)
+    и сжатыми копиями .gz рядом с ней. Хеш-имена не меняются, пока
+    не изменится файл, поэтому их можно кешировать навсегда.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Статика ещё не собрана (разработка, тесты): имя как есть.
+            return name
+
+    def is_immutable(self, name):
+        return name in self.hashed_files.values()
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(paths) | set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        buffer = io.BytesIO()
+        # mtime=0: одинаковый файл даёт одинаковый .gz при каждой сборке.
+        with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gz_file:
+            gz_file.write(content)
+        compressed = buffer.getvalue()
+        if len(compressed) >= len(content):
+            return
+        gz_name = name + ".gz"
+        if self.exists(gz_name):
+            self.delete(gz_name)
+        self._save(gz_name, ContentFile(compressed))
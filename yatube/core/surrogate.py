@@ -0,0 +1,115 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+HEADER = "Surrogate-Key"
+VERSION_PREFIX = "surrogate:"
+# Версия, которой у метки не бывает: запись с ней сразу промах.
+STALE = "stale"
+
+_local = threading.local()
+
+
+def new_version(purged=None):
+    """
+    Версия метки: время сброса и случайная часть. У версии, которую
+    получила метка без purge(), время нулевое.
+    """
+    return f"{purged or 0}:{uuid.uuid4().hex}"
+
+
+def purged_at(version):
+    stamp, separator, _ = version.partition(":")
+    return float(stamp) if separator else 0
+
+
+def purged_since(versions, started):
+    """
+    Есть ли среди версий сброшенные purge() после started (time.time()).
+    Такие версии могли появиться уже после чтения данных: сохранить
+    данные под ними — значит отдавать старое как новое.
+    """
+    return any(purged_at(version) >= started
+               for version in versions.values())
+
+
+def tag_versions(tags):
+    """
+    Текущие версии меток. Метка без версии (новая или вытесненная из
+    кеша) получает новую — помеченные ею записи становятся промахом.
+    """
+    tags = sorted(set(tags))
+    if not tags:
+        return {}
+    keys = {VERSION_PREFIX + tag: tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def purge(*tags):
+    """
+    Делает устаревшим всё, что помечено любой из меток: записи не
+    удаляются, а перестают совпадать по версии.
+    """
+    tags = {tag for tag in tags if tag}
+    if tags:
+        purged = time.time()
+        cache.set_many(
+            {VERSION_PREFIX + tag: new_version(purged) for tag in tags},
+            None)
+
+
+def is_current(versions):
+    return tag_versions(versions) == versions
+
+
+@contextmanager
+def collect_tags():
+    """
+    Собирает версии меток, отмеченных внутри блока через note_tags:
+    метки данных, которые были прочитаны (или взяты из кеша) при
+    отрисовке. Блоки могут быть вложенными — метку видят все.
+    """
+    found = {}
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(found)
+    try:
+        yield found
+    finally:
+        stack.pop()
+
+
+def note_tags(versions):
+    """Отмечает версии меток для всех открытых collect_tags."""
+    for found in getattr(_local, "stack", ()):
+        found.update(versions)
+
+
+def note_read(tags, started):
+    """
+    Отмечает версии меток данных, прочитанных после started. Если
+    метку сбросили позже, данные могли быть прочитаны ещё до изменения:
+    все метки отмечаются как STALE, и такая отрисовка не кешируется.
+    """
+    versions = tag_versions(tags)
+    if purged_since(versions, started):
+        versions = dict.fromkeys(versions, STALE)
+    note_tags(versions)
+
+
+def tag_response(response, *tags):
+    """Добавляет метки в заголовок Surrogate-Key ответа."""
+    current = response.get(HEADER, "").split()
+    for tag in tags:
+        if tag and tag not in current:
+            current.append(tag)
+    if current:
+        response[HEADER] = " ".join(current)
+    return response
@@ -0,0 +1,60 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.stampede import get_or_compute
+
+register = template.Library()
+
+
+class SWRCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on,
+                 tags=None):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.tags = tags
+
+    def render(self, context):
+        expire_time = self.expire_time.resolve(context)
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f"swrcache: таймаут не число: {expire_time!r}")
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        tags = self.tags.resolve(context).split() if self.tags else ()
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), expire_time,
+            tags=tags)
+
+
+@register.tag
+def swrcache(parser, token):
+    """
+    Замена {% cache %} с теми же аргументами: истёкший фрагмент
+    отдаётся, пока его перерисовывает один запрос.
+
+        {% swrcache timeout fragment_name var1 var2 %}...{% endswrcache %}
+
+    Последним аргументом можно передать метки через пробел:
+    tags="feed:index group:slug" — purge() любой из них сбросит фрагмент.
+    """
+    nodelist = parser.parse(("endswrcache",))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    tags = None
+    if len(bits) > 3 and bits[-1].startswith("tags="):
+        tags = parser.compile_filter(bits.pop()[len("tags="):])
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"{bits[0]} ожидает таймаут и имя фрагмента")
+    return SWRCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:]],
+        tags,
+    )
@@ -1,4 +1,5 @@
 from django import template
+from django.http import QueryDict
 
 register = template.Library()
 
@@ -6,3 +7,18 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={"class": css})
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor=None):
+    """
+    Ссылка на страницу по курсору. Из параметров запроса сохраняется
+    только поисковый запрос query: ссылки ленты кешируются во
+    фрагменте, общем для любых строк запроса.
+    """
+    query = QueryDict(mutable=True)
+    if context.get("query"):
+        query["q"] = context["query"]
+    if cursor:
+        query["cursor"] = cursor
+    return f"?{query.urlencode()}"
@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from core.cache import TieredCache
+
+
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.first = self.worker()
+        self.second = self.worker()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def worker(self, **options):
+        """Отдельный экземпляр кеша — как в другом процессе."""
+        options.setdefault('SYNC_INTERVAL', 0)
+        return TieredCache(
+            str(Path(self.directory, 'cache.sqlite3')),
+            {'OPTIONS': options})
+
+    def test_shared_between_workers(self):
+        """Записанное одним воркером читает другой."""
+        self.first.set('key', {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        stats = self.second.stats()
+        self.assertEqual(stats['l2_hits'], 1)
+        self.assertEqual(stats['l1_hits'], 1)
+
+    def test_write_invalidates_other_workers(self):
+        """Новое значение и clear() вытесняют копии в L1 соседей."""
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+        self.first.set('key', 'again')
+        self.assertEqual(self.second.get('key'), 'again')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_l1_serves_until_sync(self):
+        """Между синхронизациями чтения не ходят в общий файл."""
+        lazy = self.worker(SYNC_INTERVAL=3600)
+        lazy.get('key')
+        self.first.set('key', 'value')
+        self.assertEqual(lazy.get('key'), 'value')
+        self.first.set('key', 'changed')
+        self.assertEqual(lazy.get('key'), 'value')
+
+    def test_l1_is_bounded(self):
+        """L1 вытесняет давно не читанные ключи."""
+        cache = self.worker(L1_MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.get('a')
+        self.assertEqual(list(cache.l1.data), [cache.make_key('c'),
+                                               cache.make_key('a')])
+        self.assertEqual(cache.get_many(['a', 'b', 'c']),
+                         {'a': 'a', 'b': 'b', 'c': 'c'})
+
+    def test_expiry(self):
+        self.first.set('key', 'value', timeout=0.05)
+        self.assertEqual(self.first.get('key'), 'value')
+        time.sleep(0.06)
+        self.assertIsNone(self.first.get('key'))
+        self.assertIsNone(self.second.get('key'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.first.add('counter', 1))
+        self.assertFalse(self.second.add('counter', 5))
+        self.assertEqual(self.second.incr('counter'), 2)
+        self.assertEqual(self.first.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.first.incr('missing')
+
+    def test_stats_collected_from_all_workers(self):
+        self.first.get('key')
+        self.second.set('key', 1)
+        self.second.get('key')
+        self.first.get('key')
+        self.first.get('other')
+        self.second.get('other')
+        self.second.sync(time.time())
+        stats = self.first.stats()
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['l1_hits'] + stats['l2_hits'], 2)
+        self.assertAlmostEqual(stats['hit_rate'], 0.4)
+
+    def test_test_database_gets_own_file(self):
+        """Кеш тестовой базы в памяти не пишет в общий файл."""
+        path = Path(self.directory, 'shared.sqlite3')
+        cache = TieredCache(str(path), {'OPTIONS': {'DATABASE': 'default'}})
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertFalse(path.exists())
+        self.assertNotEqual(cache.location(), str(path))
@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+from core.css import purge_css, used_tokens
+
+CSS = (
+    '@charset "UTF-8";/*! Лицензия */'
+    'body{margin:0}'
+    '.btn{color:red}.btn-lg,.unused{padding:1rem}'
+    '.nav .unused{color:blue}'
+    '.form-control:not(.unused){border:0}'
+    '@media (min-width:576px){.container{width:540px}.unused{width:0}}'
+    '@media print{.unused{display:none}}'
+    '@keyframes spin{to{transform:rotate(360deg)}}'
+)
+
+
+class PurgeCssTest(SimpleTestCase):
+    def setUp(self):
+        self.tokens = used_tokens([
+            '<a class="btn btn-lg {% if active %}nav{% endif %}">',
+            '{{ form.text|addclass:"form-control container" }}',
+        ])
+
+    def test_unused_rules_removed(self):
+        """Правила с неиспользуемыми классами удаляются."""
+        self.assertEqual(
+            purge_css(CSS, self.tokens),
+            '@charset "UTF-8";/*! Лицензия */'
+            'body{margin:0}'
+            '.btn{color:red}.btn-lg{padding:1rem}'
+            '.form-control:not(.unused){border:0}'
+            '@media (min-width:576px){.container{width:540px}}'
+            '@keyframes spin{to{transform:rotate(360deg)}}'
+        )
+
+    def test_inline_css_without_charset_and_banner(self):
+        """Для встраивания в <style> @charset и лицензия не нужны."""
+        self.assertTrue(
+            purge_css(CSS, self.tokens, inline=True).startswith(
+                'body{margin:0}'))
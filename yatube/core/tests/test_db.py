@@ -0,0 +1,21 @@
+from django.db import connection
+from django.test import TestCase
+
+
+class SqlitePragmasTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_configured(self):
+        """Новое соединение получает настройки из SQLITE_PRAGMAS."""
+        expected = {
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'temp_store': 2,
+            'cache_size': -20000,
+        }
+        for name, value in expected.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(name), value)
@@ -0,0 +1,68 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.stampede import LOCK_SUFFIX, get_or_compute
+
+
+class StampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def expire(self, key):
+        entry = cache.get(key)
+        entry['expires'] = time.time() - 1
+        cache.set(key, entry)
+
+    def test_fresh_value_not_recomputed(self):
+        get_or_compute('key', self.compute, 60)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока один пересчитывает, остальные получают старое значение."""
+        get_or_compute('key', self.compute, 60)
+        self.expire('key')
+        cache.add('key' + LOCK_SUFFIX, 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_lock_owner_recomputes(self):
+        get_or_compute('key', self.compute, 60)
+        self.expire('key')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 2')
+        self.assertIsNone(cache.get('key' + LOCK_SUFFIX))
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 2')
+
+    def test_early_refresh_before_expiry(self):
+        """Долгий расчёт обновляется заранее, до истечения срока."""
+        get_or_compute('key', self.compute, 60)
+        entry = cache.get('key')
+        entry['delta'] = 30
+        cache.set('key', entry)
+        with mock.patch('core.stampede.random.random', return_value=0.99):
+            self.assertEqual(
+                get_or_compute('key', self.compute, 60), 'value 2')
+
+    @override_settings(STAMPEDE_WAIT=0)
+    def test_cold_miss_computes_after_wait(self):
+        cache.add('key' + LOCK_SUFFIX, 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load stampede %}'
+            '{% swrcache 60 fragment name %}{{ name }}{% endswrcache %}')
+        self.assertEqual(template.render(Context({'name': 'a'})), 'a')
+        key = make_template_fragment_key('fragment', ['a'])
+        self.assertEqual(cache.get(key)['value'], 'a')
+        self.assertEqual(template.render(Context({'name': 'b'})), 'b')
@@ -0,0 +1,71 @@
+import gzip
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def test_pages_link_hashed_static(self):
+        """Шаблоны ссылаются на статику с хешем в имени."""
+        hashed = staticfiles_storage.stored_name('css/bootstrap.purged.css')
+        self.assertNotEqual(hashed, 'css/bootstrap.purged.css')
+        # Страница из кеша могла быть отрисована до collectstatic.
+        cache.clear()
+        response = self.client.get('/')
+        self.assertContains(response, settings.STATIC_URL + hashed)
+
+    def test_precompressed_static_served(self):
+        """Клиенту с gzip отдаётся сжатая копия с вечным кешем."""
+        hashed = staticfiles_storage.stored_name('css/bootstrap.purged.css')
+        response = self.client.get(
+            settings.STATIC_URL + hashed, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = gzip.decompress(b''.join(response.streaming_content))
+        with staticfiles_storage.open(hashed) as original:
+            self.assertEqual(body, original.read())
+
+    def test_accept_encoding_quality(self):
+        """gzip;q=0 — отказ от gzip; «*» и q > 0 — согласие."""
+        hashed = staticfiles_storage.stored_name('css/bootstrap.purged.css')
+        cases = (
+            ('gzip;q=0, br', False),
+            ('br, gzip ; q=0.0', False),
+            ('gzip;q=bad', False),
+            ('*', True),
+            ('*, gzip;q=0', False),
+            ('br;q=1, GZIP;q=0.5', True),
+            ('identity', False),
+        )
+        for header, compressed in cases:
+            with self.subTest(header=header):
+                response = self.client.get(
+                    settings.STATIC_URL + hashed, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(
+                    response.get('Content-Encoding') == 'gzip', compressed)
+
+    def test_plain_static_without_gzip(self):
+        """Без gzip в Accept-Encoding файл отдаётся как есть."""
+        response = self.client.get(settings.STATIC_URL + 'img/logo.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
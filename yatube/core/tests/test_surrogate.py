@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from core.surrogate import (HEADER, is_current, purge, tag_response,
+                            tag_versions)
+
+
+class SurrogateKeysTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_purge_changes_only_its_tags(self):
+        versions = tag_versions(['post:1', 'post:2'])
+        self.assertTrue(is_current(versions))
+        purge('post:1')
+        current = tag_versions(['post:1', 'post:2'])
+        self.assertNotEqual(current['post:1'], versions['post:1'])
+        self.assertEqual(current['post:2'], versions['post:2'])
+        self.assertFalse(is_current(versions))
+
+    def test_tag_response(self):
+        response = tag_response(HttpResponse(), 'feed:index', 'post:1')
+        tag_response(response, 'post:1', None, 'author:2')
+        self.assertEqual(response[HEADER], 'feed:index post:1 author:2')
+
+    def test_purged_fragment_rerendered(self):
+        """Фрагмент с метками после purge() рисуется заново."""
+        template = Template(
+            '{% load stampede %}'
+            '{% swrcache 3600 fragment tags="post:1 author:1" %}'
+            '{{ text }}{% endswrcache %}')
+        self.assertEqual(template.render(Context({'text': 'old'})), 'old')
+        self.assertEqual(template.render(Context({'text': 'new'})), 'old')
+        purge('author:1')
+        self.assertEqual(template.render(Context({'text': 'new'})), 'new')
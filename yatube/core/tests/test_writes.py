@@ -0,0 +1,200 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, transaction
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.surrogate import tag_versions
+from core.writes import (WriteCoordinator, WriteQueueFull, WriteTimeout,
+                         coordinator, write)
+from posts.models import Group, Post, UserStats
+from posts.surrogate import FEED_TAG
+
+User = get_user_model()
+
+
+class WriteCoordinatorTest(TransactionTestCase):
+    def setUp(self):
+        self.coordinator = WriteCoordinator(
+            queue_size=10, batch_size=10, retries=2, backoff=0, timeout=0,
+            result_timeout=5)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def block(self):
+        """Занимает писателя, пока тест не отпустит его."""
+        started = threading.Event()
+
+        def wait():
+            started.set()
+            self.release.wait(5)
+
+        future = self.coordinator.submit(wait)
+        started.wait(5)
+        return future
+
+    def test_waiting_jobs_committed_together(self):
+        """Накопившиеся задания выполняются одной пачкой."""
+        batches = []
+        take = self.coordinator.take
+        self.coordinator.take = lambda: batches.append(take()) or batches[-1]
+        self.block()
+        futures = [
+            self.coordinator.submit(
+                Group.objects.create, title=f'g{i}', slug=f'g{i}')
+            for i in range(3)
+        ]
+        self.release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual([len(batch) for batch in batches], [1, 3])
+        self.assertEqual(Group.objects.count(), 3)
+
+    def test_failed_job_does_not_roll_back_batch(self):
+        """Ошибка задания откатывает только его точку сохранения."""
+        def fail():
+            Group.objects.create(title='x', slug='x')
+            raise ValueError
+
+        self.block()
+        failed = self.coordinator.submit(fail)
+        created = self.coordinator.submit(
+            Group.objects.create, title='ok', slug='ok')
+        self.release.set()
+        with self.assertRaises(ValueError):
+            failed.result(5)
+        self.assertEqual(created.result(5).slug, 'ok')
+        self.assertEqual(
+            list(Group.objects.values_list('slug', flat=True)), ['ok'])
+
+    def test_busy_database_retried(self):
+        """«database is locked» повторяется, а не отдаётся вызывающему."""
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        self.assertEqual(self.coordinator.call(flaky), 'done')
+        self.assertEqual(len(calls), 2)
+
+    def test_retried_batch_commits_side_effects_once(self):
+        """Отложенное on_commit из откаченной попытки не выполняется."""
+        effects = []
+
+        def flaky():
+            transaction.on_commit(lambda: effects.append(1))
+            if not effects and not hasattr(flaky, 'failed'):
+                flaky.failed = True
+                raise OperationalError('database is locked')
+
+        self.coordinator.call(flaky)
+        self.assertEqual(effects, [1])
+
+    def test_result_wait_limited(self):
+        """Вызывающий не ждёт занятого писателя бесконечно."""
+        self.coordinator.result_timeout = 0.1
+        self.block()
+        with self.assertRaises(WriteTimeout):
+            self.coordinator.call(int)
+
+    def test_timed_out_write_cancelled(self):
+        """Не дождавшаяся писателя запись не выполняется позже."""
+        self.coordinator.result_timeout = 0.1
+        blocker = self.block()
+        effects = []
+        with self.assertRaises(WriteTimeout):
+            self.coordinator.call(effects.append, 1)
+        self.release.set()
+        blocker.result(5)
+        self.coordinator.call(int)
+        self.assertEqual(effects, [])
+
+    def test_full_queue_rejected(self):
+        """Ограниченная очередь не растёт без предела."""
+        self.coordinator.queue_size = 1
+        self.block()
+        self.coordinator.submit(int)
+        with self.assertRaises(WriteQueueFull):
+            self.coordinator.submit(int)
+
+
+class CoordinatedViewTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+        self.threads = []
+        post_save.connect(self.remember_thread, sender=Post)
+
+    def tearDown(self):
+        post_save.disconnect(self.remember_thread, sender=Post)
+
+    def remember_thread(self, **kwargs):
+        self.threads.append(threading.current_thread())
+
+    def test_new_post_written_by_coordinator(self):
+        """Пост из формы сохраняет писатель, метки сбрасываются после."""
+        versions = tag_versions([FEED_TAG])
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Через писателя'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.threads, [coordinator.thread])
+        self.assertTrue(Post.objects.filter(text='Через писателя').exists())
+        # У потока писателя свой экземпляр кеша: читаем через него.
+        self.assertNotEqual(
+            coordinator.call(tag_versions, [FEED_TAG]), versions)
+
+    def test_stats_created_by_coordinator(self):
+        """Строку счётчиков при первом чтении страницы создаёт писатель."""
+        post_save.connect(self.remember_thread, sender=UserStats)
+        try:
+            response = self.client.get(
+                reverse('posts:profile', args=[self.user.username]))
+        finally:
+            post_save.disconnect(self.remember_thread, sender=UserStats)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.threads, [coordinator.thread])
+        self.assertTrue(UserStats.objects.filter(user=self.user).exists())
+
+    def test_write_from_on_commit_runs_in_writer(self):
+        """Запись из on_commit писателя не ставится в его же очередь."""
+        threads = []
+
+        def job():
+            transaction.on_commit(
+                lambda: threads.append(write(threading.current_thread)))
+
+        coordinator.call(job)
+        self.assertEqual(threads, [coordinator.thread])
+
+
+class WriteOverloadTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='overloaded')
+        self.client.force_login(self.user)
+
+    def test_overload_answers_503(self):
+        """Перегруженный писатель — 503 с Retry-After, а не 500."""
+        for error in (WriteQueueFull, WriteTimeout):
+            with self.subTest(error=error.__name__):
+                with mock.patch('posts.views.write', side_effect=error):
+                    response = self.client.post(
+                        reverse('posts:post_create'), {'text': 'Пост'})
+                self.assertEqual(response.status_code, 503)
+                self.assertTrue(response.has_header('Retry-After'))
+        self.assertFalse(Post.objects.exists())
+
+
+class InlineWriteTest(TestCase):
+    def test_write_inside_transaction_runs_inline(self):
+        """Внутри транзакции запись становится её частью."""
+        with transaction.atomic():
+            thread = write(threading.get_ident)
+        self.assertEqual(thread, threading.get_ident())
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загрузки сразу во временный файл на диске, не держа их в
+    памяти. Сверх UPLOAD_MAX_SIZE данные не записываются, но размер
+    файла учитывается полностью — форма отклонит такую загрузку.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.UPLOAD_MAX_SIZE:
+            self.file.write(raw_data)
@@ -1,4 +1,17 @@
+import mimetypes
+import posixpath
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .negotiation import accepts_gzip
+
+# Имена с хешем содержимого не меняются: кешируем на год.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STATIC_CACHE_CONTROL = "public, max-age=3600"
 
 
 def page_not_found(request, exception):
@@ -15,3 +28,36 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def static_file(request, path):
+    """
+    Отдаёт собранную статику из STATIC_ROOT. Клиенту, принимающему
+    gzip, отдаётся заранее сжатая копия .gz, если она есть.
+    """
+    name = posixpath.normpath(path).lstrip("/")
+    if name.startswith("..") or not staticfiles_storage.exists(name):
+        raise Http404
+    modified = staticfiles_storage.get_modified_time(name)
+    if not was_modified_since(
+            request.META.get("HTTP_IF_MODIFIED_SINCE"),
+            modified.timestamp()):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(name)[0]
+    served = name
+    if accepts_gzip(request) and staticfiles_storage.exists(name + ".gz"):
+        served = name + ".gz"
+    response = FileResponse(
+        staticfiles_storage.open(served),
+        content_type=content_type or "application/octet-stream",
+    )
+    if served != name:
+        response["Content-Encoding"] = "gzip"
+    response["Vary"] = "Accept-Encoding"
+    response["Last-Modified"] = http_date(modified.timestamp())
+    if staticfiles_storage.is_immutable(name):
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response["Cache-Control"] = STATIC_CACHE_CONTROL
+    return response
@@ -0,0 +1,213 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGES = ("database is locked", "database table is locked",
+                 "database is busy")
+
+
+class WriteQueueFull(Exception):
+    """Очередь записи переполнена: запрос не дождался места."""
+
+
+class WriteTimeout(Exception):
+    """Писатель не выполнил запись за WRITE_RESULT_TIMEOUT секунд."""
+
+
+def is_busy(error):
+    message = str(error).lower()
+    return any(busy in message for busy in BUSY_MESSAGES)
+
+
+class Job:
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+    def run(self):
+        return self.func(*self.args, **self.kwargs)
+
+
+class WriteCoordinator:
+    """
+    Единственный писатель процесса. Записи из всех потоков попадают
+    в ограниченную очередь и выполняются по одной в отдельном потоке,
+    поэтому запросы процесса не соревнуются за блокировку SQLite.
+
+    Накопившиеся в очереди задания выполняются пачкой в одной
+    транзакции (групповая фиксация), каждое — в своей точке
+    сохранения: ошибка одного задания не откатывает соседей.
+    При «database is locked» (пишет другой процесс) пачка
+    повторяется с нарастающей паузой.
+
+    Побочные эффекты заданий (сброс кешей в сигналах) откладываются
+    через transaction.on_commit: они выполняются один раз, после
+    фиксации всей пачки, и пропадают вместе с откатом повтора.
+    """
+
+    def __init__(self, queue_size=None, batch_size=None, retries=None,
+                 backoff=None, timeout=None, result_timeout=None):
+        self.queue_size = queue_size or settings.WRITE_QUEUE_SIZE
+        self.batch_size = batch_size or settings.WRITE_BATCH_SIZE
+        self.retries = (
+            settings.WRITE_RETRIES if retries is None else retries)
+        self.backoff = (
+            settings.WRITE_RETRY_BACKOFF if backoff is None else backoff)
+        self.timeout = (
+            settings.WRITE_QUEUE_TIMEOUT if timeout is None else timeout)
+        self.result_timeout = (
+            settings.WRITE_RESULT_TIMEOUT if result_timeout is None
+            else result_timeout)
+        self.jobs = queue.Queue(self.queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def start(self):
+        """Запускает поток-писатель; после fork — заново."""
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                if self.thread.is_alive():
+                    return
+            self.pid = os.getpid()
+            self.jobs = queue.Queue(self.queue_size)
+            self.thread = threading.Thread(
+                target=self.loop, name="db-writer", daemon=True)
+            self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Ставит запись в очередь и возвращает Future с результатом."""
+        self.start()
+        job = Job(func, args, kwargs)
+        try:
+            self.jobs.put(job, timeout=self.timeout)
+        except queue.Full:
+            raise WriteQueueFull(
+                f"Очередь записи заполнена ({self.queue_size})")
+        return job.future
+
+    def call(self, func, *args, **kwargs):
+        """
+        Ждёт результат не дольше result_timeout. Запись, которую писатель
+        за это время не начал, отменяется: иначе она выполнилась бы уже
+        после ошибки, и повторная отправка формы задвоила бы её. Начатую
+        запись приходится дождаться.
+        """
+        future = self.submit(func, *args, **kwargs)
+        try:
+            return future.result(self.result_timeout)
+        except TimeoutError:
+            if not future.cancel():
+                return future.result()
+            raise WriteTimeout(
+                f"Запись не выполнена за {self.result_timeout} с")
+
+    def is_writer(self):
+        return threading.current_thread() is self.thread
+
+    def loop(self):
+        while True:
+            batch = self.take()
+            try:
+                self.commit(batch)
+            except Exception as error:
+                logger.exception("Пачка записей не выполнена")
+                for job in batch:
+                    if not job.future.done():
+                        job.future.set_exception(error)
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+    def take(self):
+        """Первое задание ждёт, остальные забираются без ожидания."""
+        batch = [self.jobs.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def commit(self, batch):
+        # Отменённые вызывающим задания не выполняются.
+        batch = [job for job in batch
+                 if job.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        for attempt in range(self.retries + 1):
+            try:
+                results = self.attempt(batch)
+            except OperationalError as error:
+                if not is_busy(error) or attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            for job, (ok, value) in zip(batch, results):
+                if ok:
+                    job.future.set_result(value)
+                else:
+                    job.future.set_exception(value)
+            return
+
+    def attempt(self, batch):
+        results = []
+        with transaction.atomic():
+            for job in batch:
+                try:
+                    with transaction.atomic():
+                        results.append((True, job.run()))
+                except OperationalError as error:
+                    if is_busy(error):
+                        raise
+                    results.append((False, error))
+                except Exception as error:
+                    results.append((False, error))
+        return results
+
+
+coordinator = WriteCoordinator()
+
+
+def write(func, *args, **kwargs):
+    """
+    Выполняет запись через писателя процесса и возвращает её результат.
+    Внутри открытой транзакции запись выполняется на месте: она должна
+    стать частью этой транзакции (так же работают и тесты). В самом
+    писателе (например, из on_commit) — тоже: иначе он ждал бы себя.
+    """
+    if (not settings.WRITE_COORDINATOR or connection.in_atomic_block
+            or coordinator.is_writer()):
+        return func(*args, **kwargs)
+    return coordinator.call(func, *args, **kwargs)
+
+
+class WriteOverloadMiddleware:
+    """
+    Перегруженный писатель — временная ошибка: вместо 500 клиент
+    получает 503 с Retry-After, а запись не выполнена (см. call).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, (WriteQueueFull, WriteTimeout)):
+            return None
+        logger.warning("Запись отклонена: %s", exception)
+        response = render(request, "core/503.html", status=503)
+        response["Retry-After"] = str(settings.WRITE_RETRY_AFTER)
+        return response
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import search_filter
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,12 +11,23 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_filter(queryset, search_term), False
+
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("pk", "post", "author", "text", "created")
     search_fields = ("text",)
     list_filter = ("created",)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_filter(
+            queryset, search_term, index="posts_comment_fts"), False
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ("pk", "user", "author", "created")
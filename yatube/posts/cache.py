@@ -0,0 +1,23 @@
+import uuid
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = "posts:feed_version"
+
+
+def get_feed_version():
+    """Текущая версия содержимого ленты для ключей кеша."""
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        version = bump_feed_version()
+    return version
+
+
+def bump_feed_version():
+    """
+    Меняет версию ленты: все закешированные страницы становятся
+    недоступными без перебора ключей.
+    """
+    version = uuid.uuid4().hex
+    cache.set(FEED_VERSION_KEY, version, None)
+    return version
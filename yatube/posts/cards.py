@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .thumbnails import prefetch_thumbnails
+
+CARD_TEMPLATE = "posts/includes/post_list.html"
+
+
+def card_version(post):
+    """
+    Всё, от чего зависит карточка: пост (updated меняется при каждом
+    сохранении), имя автора и адрес группы.
+    """
+    author = post.author
+    group_slug = post.group.slug if post.group_id else ""
+    return (f"{post.id}:{post.updated.timestamp()}:{author.username}:"
+            f"{author.get_full_name()}:{group_slug}")
+
+
+def digest(parts):
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def card_key(post, template_name):
+    return f"post_card:{digest([template_name, card_version(post)])}"
+
+
+def render_cards(posts, template_name=CARD_TEMPLATE):
+    """
+    Пары (пост, HTML карточки). Готовые карточки читаются из кеша
+    одним запросом, недостающие рисуются и сохраняются пачкой; только
+    им нужны миниатюры, и те читаются одним пакетом.
+    """
+    posts = list(posts)
+    keys = [card_key(post, template_name) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    absent = [(post, key) for post, key in zip(posts, keys)
+              if key not in cards]
+    with prefetch_thumbnails(post for post, _ in absent):
+        for post, key in absent:
+            missing[key] = render_to_string(template_name, {"post": post})
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+        cards.update(missing)
+    return [(post, cards[key]) for post, key in zip(posts, keys)]
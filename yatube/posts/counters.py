@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from core.writes import write
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def count_user(user_id):
+    """Честный пересчёт счётчиков пользователя по таблицам."""
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def create_stats(user_id):
+    stats, _ = UserStats.objects.get_or_create(
+        user_id=user_id, defaults=count_user(user_id))
+    return stats
+
+
+def get_stats(user):
+    """
+    Счётчики пользователя. Строка создаётся пересчётом при первом
+    чтении — через писателя процесса, как и остальные записи
+    запросов, — дальше её поддерживают сигналы.
+    """
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        return write(create_stats, user.id)
+
+
+def change_user_count(user_id, field, delta):
+    """
+    Сдвигает счётчик на delta одним UPDATE. Отсутствующую строку
+    не создаёт: её пересчитает get_stats при чтении.
+    """
+    queryset = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_comments_count(post_id, delta):
+    queryset = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        queryset = queryset.filter(comments_count__gte=-delta)
+    queryset.update(comments_count=F('comments_count') + delta)
+
+
+def change_follow_counts(user_id, author_id, delta):
+    with transaction.atomic():
+        change_user_count(user_id, 'following_count', delta)
+        change_user_count(author_id, 'followers_count', delta)
+
+
+def _batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+def _grouped_counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).values(field)
+        .annotate(total=Count('id')).values_list(field, 'total')
+    )
+
+
+def reconcile_users(batch_size=500):
+    """Исправляет расхождения UserStats пачками. Возвращает число правок."""
+    fixed = 0
+    for ids in _batches(User.objects.all(), batch_size):
+        counts = {
+            'posts_count': _grouped_counts(Post.objects, 'author_id', ids),
+            'followers_count': _grouped_counts(
+                Follow.objects, 'author_id', ids),
+            'following_count': _grouped_counts(Follow.objects, 'user_id', ids),
+        }
+        with transaction.atomic():
+            existing = UserStats.objects.select_for_update().in_bulk(ids)
+            to_create, to_update = [], []
+            for user_id in ids:
+                actual = {
+                    field: values.get(user_id, 0)
+                    for field, values in counts.items()
+                }
+                stats = existing.get(user_id)
+                if stats is None:
+                    to_create.append(UserStats(user_id=user_id, **actual))
+                elif any(getattr(stats, field) != value
+                         for field, value in actual.items()):
+                    for field, value in actual.items():
+                        setattr(stats, field, value)
+                    to_update.append(stats)
+            UserStats.objects.bulk_create(to_create)
+            UserStats.objects.bulk_update(to_update, list(counts))
+        fixed += len(to_create) + len(to_update)
+    return fixed
+
+
+def reconcile_posts(batch_size=500):
+    """Исправляет Post.comments_count пачками. Возвращает число правок."""
+    fixed = 0
+    for ids in _batches(Post.objects.all(), batch_size):
+        counts = _grouped_counts(Comment.objects, 'post_id', ids)
+        with transaction.atomic():
+            posts = Post.objects.select_for_update().filter(
+                pk__in=ids).only('pk', 'comments_count')
+            to_update = []
+            for post in posts:
+                actual = counts.get(post.pk, 0)
+                if post.comments_count != actual:
+                    post.comments_count = actual
+                    to_update.append(post)
+            Post.objects.bulk_update(to_update, ['comments_count'])
+        fixed += len(to_update)
+    return fixed
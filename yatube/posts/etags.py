@@ -0,0 +1,82 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from core.surrogate import HEADER, tag_versions
+
+from .cache import get_feed_version
+
+PAGE_TAGS_KEY = "etag_tags:{}"
+
+
+def make_etag(request, versions, *parts):
+    """
+    ETag ответа: версии данных, части страницы и состояние зрителя —
+    от него зависят шапка, кнопки и CSRF-токен в формах.
+    """
+    viewer = (
+        request.user.pk if request.user.is_authenticated else "anonymous",
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        request.GET.get("cursor", ""),
+    )
+    raw = repr((versions, parts, viewer)).encode()
+    return hashlib.md5(raw).hexdigest()
+
+
+def feed_version_etag(request, *parts):
+    """
+    ETag по общей версии ленты (меняется при любой правке постов,
+    групп и комментариев) — для ответов без меток Surrogate-Key.
+    """
+    return make_etag(request, get_feed_version(), *parts)
+
+
+def page_tags_key(request):
+    """Метки страницы не зависят от зрителя: ключ — адрес и курсор."""
+    raw = f"{request.path}?{request.GET.get('cursor', '')}"
+    return PAGE_TAGS_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+
+def tags_etag(request, tags):
+    return make_etag(request, tag_versions(tags), request.path)
+
+
+def page_etag(request, *args, **kwargs):
+    """
+    ETag по текущим версиям меток, которые страница отдала в прошлый
+    раз: без запросов к базе. Пока меток нет, 304 не будет.
+    """
+    tags = cache.get(page_tags_key(request))
+    if tags is None:
+        return None
+    return tags_etag(request, tags)
+
+
+def page_condition(view):
+    """
+    Условный GET для страницы с метками Surrogate-Key: ETag меняется
+    после purge() любой метки страницы — правки её постов, имени
+    автора, группы, комментариев и подписок.
+
+    Если метки ответа совпали с запомненными, остаётся ETag,
+    посчитанный до отрисовки: версии прочитаны раньше данных, и purge()
+    во время отрисовки не потеряется. Иначе метки запоминаются,
+    а ETag считается по ним.
+    """
+    @condition(etag_func=page_etag)
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        tags = response.get(HEADER, "").split()
+        if response.status_code != 200 or not tags:
+            return response
+        key = page_tags_key(request)
+        if cache.get(key) != tags:
+            cache.set(key, tags, settings.ETAG_TAGS_TIMEOUT)
+            response["ETag"] = quote_etag(tags_etag(request, tags))
+        return response
+    return wrapper
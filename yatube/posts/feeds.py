@@ -0,0 +1,144 @@
+import heapq
+from itertools import dropwhile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from core.paginator import CursorPaginator
+
+from .models import Follow, Post
+
+AUTHOR_FEED_KEY = "posts:author_feed:{}"
+
+
+def author_feed_key(author_id):
+    return AUTHOR_FEED_KEY.format(author_id)
+
+
+def get_author_feeds(author_ids):
+    """
+    Списки последних постов авторов: {author_id: (keys, truncated)},
+    где keys — пары (pub_date, id) по убыванию, не длиннее
+    AUTHOR_FEED_SIZE. Недостающие списки строятся из БД и кешируются.
+    """
+    size = settings.AUTHOR_FEED_SIZE
+    keys = {author_feed_key(author_id): author_id for author_id in author_ids}
+    cached = cache.get_many(keys)
+    feeds = {keys[key]: value for key, value in cached.items()}
+    missing = {}
+    for key, author_id in keys.items():
+        if author_id in feeds:
+            continue
+        items = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by("-pub_date", "-id")
+            .values_list("pub_date", "id")[:size + 1]
+        )
+        feeds[author_id] = missing[key] = (
+            items[:size], len(items) > size)
+    if missing:
+        cache.set_many(missing, None)
+    return feeds
+
+
+def invalidate_author_feed(author_id):
+    cache.delete(author_feed_key(author_id))
+
+
+class MergedFeedPaginator(CursorPaginator):
+    """
+    Лента подписок без хранения: страница собирается k-way слиянием
+    закешированных списков последних постов каждого автора.
+
+    Слиянию можно доверять до «горизонта» — самого свежего из последних
+    элементов обрезанных списков. Глубже страница читается одним
+    запросом по подпискам (pull).
+    """
+
+    def __init__(self, user, per_page):
+        self.user = user
+        super().__init__(
+            Post.objects.select_related("author", "group").filter(
+                author__following__user=user),
+            per_page,
+        )
+
+    def pull(self, author_ids, values, reverse):
+        """
+        Страница за горизонтом: один запрос по author__in от позиции,
+        упорядоченный и ограниченный per_page + 1 постами.
+        """
+        queryset = Post.objects.select_related("author", "group").filter(
+            author_id__in=author_ids)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        queryset = queryset.order_by(*self.ordering)
+        if reverse:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def fetch(self, values, reverse):
+        author_ids = list(
+            Follow.objects.filter(user=self.user).order_by().values_list(
+                "author_id", flat=True)
+        )
+        if not author_ids:
+            return []
+        feeds = get_author_feeds(author_ids).values()
+        horizon = max(
+            (items[-1] for items, truncated in feeds if truncated),
+            default=None,
+        )
+        position = tuple(values) if values is not None else None
+        if position is not None and horizon is not None and position < horizon:
+            return self.pull(author_ids, values, reverse)
+
+        if reverse:
+            keys = sorted(
+                key for items, _ in feeds for key in items if key > position)
+            keys = keys[:self.per_page + 1]
+        else:
+            streams = [
+                dropwhile(lambda key: position is not None and key >= position,
+                          items)
+                for items, _ in feeds
+            ]
+            keys = []
+            for key in heapq.merge(*streams, reverse=True):
+                if horizon is not None and key < horizon:
+                    return self.pull(author_ids, values, reverse)
+                keys.append(key)
+                if len(keys) > self.per_page:
+                    break
+            else:
+                if horizon is not None:
+                    return self.pull(author_ids, values, reverse)
+
+        posts = Post.objects.select_related("author", "group").in_bulk(
+            [post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+
+TIMELINE_ORDERING = ("-feed_date", "-feed_post")
+
+
+def timeline_posts(user):
+    """Посты материализованной ленты пользователя с ключом сортировки."""
+    return Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_date=F("timeline_entries__pub_date"),
+        feed_post=F("timeline_entries__post"),
+    )
+
+
+def timeline_paginator(user, per_page):
+    """Пагинатор по материализованной ленте TimelineEntry."""
+    post_list = timeline_posts(user).select_related("author", "group")
+    return CursorPaginator(post_list, per_page, ordering=TIMELINE_ORDERING)
+
+
+def follow_paginator(user, per_page):
+    """Пагинатор ленты подписок для движка FOLLOW_FEED_ENGINE."""
+    if settings.FOLLOW_FEED_ENGINE == "merge":
+        return MergedFeedPaginator(user, per_page)
+    return timeline_paginator(user, per_page)
@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.utils.translation import gettext_lazy as _
 
+from .images import check_upload_size, ingest_image
 from .models import Comment, Post
 
 
@@ -16,6 +19,24 @@ class PostForm(forms.ModelForm):
             "text": forms.Textarea(attrs={"cols": 40, "rows": 10}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Обрезанный загрузчиком файл не открываем как картинку.
+        upload = self.files.get("image")
+        self.oversized_image = None
+        if upload is not None and upload.size > settings.UPLOAD_MAX_SIZE:
+            self.oversized_image = upload
+            self.files = self.files.copy()
+            del self.files["image"]
+
+    def clean_image(self):
+        if self.oversized_image is not None:
+            check_upload_size(self.oversized_image)
+        image = self.cleaned_data.get("image")
+        if isinstance(image, UploadedFile):
+            return ingest_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
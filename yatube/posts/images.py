@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+# Форматы, которые сохраняются как есть; остальные перекодируются в JPEG.
+FORMATS = {
+    "JPEG": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+}
+
+
+def check_upload_size(upload):
+    if upload.size > settings.UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            "Файл больше %(size)s.",
+            code="file_too_large",
+            params={"size": filesizeformat(settings.UPLOAD_MAX_SIZE)},
+        )
+
+
+def ingest_image(upload):
+    """
+    Готовит загруженную картинку к сохранению: проверяет число
+    пикселей до декодирования, поворачивает по EXIF, уменьшает до
+    POST_IMAGE_MAX_SIDE и сохраняет без метаданных во временный файл
+    на диске. JPEG декодируется сразу в уменьшенном масштабе.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        width, height = image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                "Слишком большое разрешение картинки.",
+                code="too_many_pixels",
+            )
+        image_format = image.format if image.format in FORMATS else "JPEG"
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side))
+    except (Image.DecompressionBombError, OSError):
+        raise ValidationError(
+            "Не удалось прочитать картинку.", code="invalid_image")
+
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image.info = {}
+    name = "%s.%s" % (
+        os.path.splitext(upload.name)[0], FORMATS[image_format])
+    result = tempfile.TemporaryFile()
+    image.save(result, image_format)
+    result.seek(0)
+    return File(result, name=name)
@@ -0,0 +1,90 @@
+import threading
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as BaseKVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+def thumbnail_key(file_, geometry, options):
+    """
+    Ключ миниатюры в KV-хранилище без обращения к файлам: те же
+    опции и имя, что вычисляет ThumbnailBackend.get_thumbnail.
+    """
+    backend = default.backend
+    source = ImageFile(file_)
+    options = dict(options)
+    if settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    filename = backend._get_thumbnail_filename(source, geometry, options)
+    return add_prefix(ImageFile(filename, default.storage).key)
+
+
+class KVStore(BaseKVStore):
+    """
+    KV-хранилище sorl (кеш + таблица в БД) с пакетным чтением:
+    ключи, заявленные через expect(), при первом промахе читаются
+    все сразу — одним get_many из кеша и одним запросом к БД.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    @property
+    def _expected(self):
+        return getattr(self._local, 'expected', set())
+
+    @property
+    def _loaded(self):
+        return getattr(self._local, 'loaded', {})
+
+    def expect(self, keys):
+        self._local.expected = set(keys)
+        self._local.loaded = {}
+
+    def forget(self):
+        self._local.expected = set()
+        self._local.loaded = {}
+
+    def _load_expected(self):
+        keys = list(self._expected)
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(fetched, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(fetched)
+        self._local.loaded = values
+        self._local.expected = set()
+
+    def _get_raw(self, key):
+        if key in self._expected:
+            self._load_expected()
+        if key in self._loaded:
+            value = self._loaded[key]
+            return None if value == EMPTY_VALUE else value
+        return super()._get_raw(key)
+
+    def _set_raw(self, key, value):
+        self._loaded.pop(key, None)
+        super()._set_raw(key, value)
+
+    def _delete_raw(self, *keys):
+        for key in keys:
+            self._loaded.pop(key, None)
+        super()._delete_raw(*keys)
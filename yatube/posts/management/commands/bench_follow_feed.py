@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.paginator import CursorPaginator
+from posts.feeds import MergedFeedPaginator, timeline_paginator
+from posts.models import Follow, Post, User
+
+
+def join_paginator(user, per_page):
+    return CursorPaginator(
+        Post.objects.filter(author__following__user=user), per_page)
+
+
+ENGINES = {
+    "join": join_paginator,
+    "timeline": timeline_paginator,
+    "merge": MergedFeedPaginator,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время построения ленты подписок: JOIN-запрос, "
+        "материализованная лента и слияние списков авторов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--pages", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        user_ids = (
+            Follow.objects.values_list("user_id", flat=True)
+            .distinct()[:options["users"]]
+        )
+        users = list(User.objects.filter(id__in=list(user_ids)))
+        if not users:
+            self.stderr.write("Нет пользователей с подписками.")
+            return
+        for name, make_paginator in ENGINES.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                for user in users:
+                    cursor = None
+                    for _ in range(options["pages"]):
+                        start = time.perf_counter()
+                        paginator = make_paginator(user, settings.POST_COUNT)
+                        list(paginator.get_page(cursor))
+                        timings.append((time.perf_counter() - start) * 1000)
+                        cursor = paginator.next_cursor
+                        if cursor is None:
+                            break
+            timings.sort()
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            self.stdout.write(
+                f"{name:>8}: страниц {len(timings)}, "
+                f"среднее {statistics.mean(timings):.2f} мс, "
+                f"p95 {p95:.2f} мс"
+            )
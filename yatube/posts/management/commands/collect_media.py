@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import collect_images, collect_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет картинки, на которые не ссылаются посты, и миниатюры, "
+        "которых нет в KV-хранилище sorl."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Не трогать файлы моложе стольких секунд.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать файлы, ничего не удаляя.",
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            "batch_size": options["batch_size"],
+            "min_age": options["min_age"],
+            "dry_run": options["dry_run"],
+        }
+        images = collect_images(**kwargs)
+        thumbnails = collect_thumbnails(**kwargs)
+        verb = "Найдено" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            f"{verb}: картинок {images}, миниатюр {thumbnails}")
@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import init_worker, rebuild_chunk
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Создаёт миниатюры всех картинок постов параллельно на всех ядрах."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--chunk-size", type=int, default=50)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Удалить существующие миниатюры перед созданием.",
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image="").exclude(image__isnull=True)
+            .order_by().values_list("image", flat=True).distinct()
+        )
+        workers = options["workers"]
+        done = 0
+        pending = set()
+        # spawn: воркеры не наследуют соединения с БД родителя.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        ) as executor:
+            for chunk in chunked(names.iterator(), options["chunk_size"]):
+                if len(pending) >= 2 * workers:
+                    finished, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    done += sum(future.result() for future in finished)
+                pending.add(
+                    executor.submit(rebuild_chunk, chunk, options["force"]))
+            done += sum(future.result() for future in pending)
+        self.stdout.write(f"Готово картинок: {done}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts, reconcile_users
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = reconcile_users(batch_size)
+        posts = reconcile_posts(batch_size)
+        self.stdout.write(
+            f"Исправлено счётчиков: пользователей {users}, постов {posts}")
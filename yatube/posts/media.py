@@ -0,0 +1,136 @@
+import logging
+import os
+import time
+
+from django.conf import settings as django_settings
+from django.db import transaction
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.writes import write
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def image_references(name):
+    """Сколько постов ссылается на файл картинки."""
+    return Post.objects.filter(image=name).count()
+
+
+def release_image(name, min_age=0):
+    """
+    Удаляет файл картинки вместе с миниатюрами, если на него больше
+    не ссылается ни один пост и он не моложе min_age секунд.
+    """
+    if not name or image_references(name):
+        return False
+    storage = Post._meta.get_field("image").storage
+    if min_age and storage.exists(name):
+        modified = os.path.getmtime(storage.path(name))
+        if modified > time.time() - min_age:
+            return False
+    delete(ImageFile(name, storage))
+    return True
+
+
+def _release_quietly(name):
+    # Неудалённый файл не ломает запрос: его подберёт collect_media.
+    try:
+        release_image(name, django_settings.IMAGE_RELEASE_MIN_AGE)
+    except Exception:
+        logger.exception("Не удалось удалить картинку %s", name)
+
+
+def release_image_on_commit(name):
+    """
+    После фиксации ссылки пересчитываются в писателе (core.writes):
+    пост процесса с тем же файлом не сохранится между проверкой
+    и удалением. Файл, который только что загрузили снова (в том
+    числе в другом процессе), остаётся до collect_media.
+    """
+    if name:
+        transaction.on_commit(lambda: write(_release_quietly, name))
+
+
+def walk_files(storage, path):
+    """
+    Имена файлов каталога хранилища рекурсивно, без чтения всего
+    дерева в память: каталоги обходятся по одному через scandir.
+    """
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(storage.path(current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = os.path.join(current, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry.stat().st_mtime
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _old_files(storage, path, min_age):
+    # Свежие файлы могут принадлежать посту, который ещё сохраняется.
+    deadline = time.time() - min_age
+    for name, modified in walk_files(storage, path):
+        if modified <= deadline:
+            yield name
+
+
+def collect_images(batch_size=500, min_age=3600, dry_run=False):
+    """Удаляет картинки постов, на которые не ссылается ни один пост."""
+    field = Post._meta.get_field("image")
+    removed = 0
+    files = _old_files(field.storage, field.upload_to, min_age)
+    for batch in _batches(files, batch_size):
+        referenced = set(
+            Post.objects.filter(image__in=batch)
+            .order_by().values_list("image", flat=True)
+        )
+        for name in batch:
+            if name not in referenced:
+                if not dry_run:
+                    delete(ImageFile(name, field.storage))
+                removed += 1
+    return removed
+
+
+def collect_thumbnails(batch_size=500, min_age=3600, dry_run=False):
+    """Удаляет файлы миниатюр, которых нет в KV-хранилище sorl."""
+    storage = default.storage
+    removed = 0
+    files = _old_files(storage, settings.THUMBNAIL_PREFIX, min_age)
+    for batch in _batches(files, batch_size):
+        keys = {
+            add_prefix(ImageFile(name, storage).key): name for name in batch
+        }
+        known = set(
+            KVStoreModel.objects.filter(key__in=keys)
+            .values_list("key", flat=True)
+        )
+        for key, name in keys.items():
+            if key not in known:
+                if not dry_run:
+                    storage.delete(name)
+                removed += 1
+    return removed
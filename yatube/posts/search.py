@@ -0,0 +1,117 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from core.paginator import CursorPaginator
+
+from .models import Post
+
+WORD_RE = re.compile(r"\w+")
+
+# Полнотекстовые индексы FTS5 (миграция 0019) с внешним содержимым:
+# тексты хранятся в таблицах моделей, индекс синхронизируют триггеры.
+INDEXES = {
+    "posts_post_fts": "posts_post",
+    "posts_comment_fts": "posts_comment",
+}
+
+TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON {table} "
+    "BEGIN INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON {table} "
+    "BEGIN INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF text "
+    "ON {table} BEGIN "
+    "INSERT INTO {index}({index}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+def ensure_triggers(using="default", **kwargs):
+    """
+    Создаёт триггеры синхронизации индекса. Вызывается после migrate:
+    SQLite пересоздаёт таблицу при изменении схемы, и триггеры
+    на старой таблице пропадают.
+    """
+    from django.db import connections
+
+    if connections[using].vendor != "sqlite":
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        existing = {name for name, in cursor.fetchall()}
+        for index, table in INDEXES.items():
+            if index not in existing:
+                continue
+            for trigger in TRIGGERS:
+                cursor.execute(trigger.format(index=index, table=table))
+
+
+def match_expression(query):
+    """
+    Запрос пользователя в выражение MATCH: каждое слово в кавычках
+    и с поиском по префиксу, слова объединяются через AND.
+    """
+    words = WORD_RE.findall(query.lower())
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_filter(queryset, query, index="posts_post_fts"):
+    """Ограничивает queryset строками, найденными в индексе."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {index} WHERE {index} MATCH %s", [expression]))
+
+
+class SearchPaginator(CursorPaginator):
+    """
+    Курсорная пагинация по релевантности: ключ (rank, id), где rank —
+    оценка bm25 из FTS5 (меньше — лучше). Посты подгружаются по id
+    одним запросом.
+    """
+
+    def __init__(self, query, per_page):
+        self.expression = match_expression(query)
+        super().__init__(
+            Post.objects.select_related("author", "group"),
+            per_page,
+            ordering=("rank", "id"),
+        )
+
+    def _field(self, name):
+        if name == "rank":
+            return FloatField()
+        return super()._field(name)
+
+    def fetch(self, values, reverse):
+        if not self.expression:
+            return []
+
+        sql = ("SELECT rowid, rank FROM posts_post_fts "
+               "WHERE posts_post_fts MATCH %s")
+        params = [self.expression]
+        if values is not None:
+            op = "<" if reverse else ">"
+            sql += f" AND (rank {op} %s OR (rank = %s AND rowid {op} %s))"
+            params += [values[0], values[0], values[1]]
+        direction = "DESC" if reverse else "ASC"
+        sql += f" ORDER BY rank {direction}, rowid {direction} LIMIT %s"
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranked = cursor.fetchall()
+
+        posts = self.object_list.in_bulk([post_id for post_id, _ in ranked])
+        rows = []
+        for post_id, rank in ranked:
+            post = posts.get(post_id)
+            if post is not None:
+                post.rank = rank
+                rows.append(post)
+        return rows
@@ -0,0 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.surrogate import purge as purge_now
+
+from .cache import bump_feed_version
+from .counters import (change_comments_count, change_follow_counts,
+                       change_user_count)
+from .feeds import invalidate_author_feed
+from .media import release_image_on_commit
+from .models import Comment, Follow, Group, Post
+from .surrogate import FEED_TAG, author_tag, group_tag, post_tag
+from .timeline import (backfill_timeline, fan_out_post, sync_post_date,
+                       trim_timeline)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+# comments_count в API меняется через update(), без сигнала Post.
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feed(sender, **kwargs):
+    # До фиксации ETag со старыми данными получил бы новую версию.
+    transaction.on_commit(bump_feed_version)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_feed_author(sender, created, raw=False, update_fields=None,
+                           **kwargs):
+    # Имя автора отдаётся в ленте API. У нового пользователя постов
+    # нет, а вход меняет только last_login.
+    if raw or created or update_fields == frozenset(["last_login"]):
+        return
+    transaction.on_commit(bump_feed_version)
+
+
+def purge(*tags):
+    """
+    Метки сбрасываются после фиксации: иначе читатель успел бы
+    закешировать старые данные уже под новой версией метки.
+    """
+    transaction.on_commit(lambda: purge_now(*tags))
+
+
+@receiver(post_save, sender=Post)
+def update_timelines(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        fan_out_post(instance)
+    else:
+        sync_post_date(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    trim_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_author_posts(sender, instance, **kwargs):
+    author_id = instance.author_id
+    transaction.on_commit(lambda: invalidate_author_feed(author_id))
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_count(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_count(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_follow_counts(instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_follow_counts(instance.user_id, instance.author_id, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    # Отложенное через only()/defer() поле не читаем: это был бы запрос.
+    image = instance.__dict__.get("image")
+    instance._stored_image = getattr(image, "name", image)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    if raw or "image" not in instance.__dict__:
+        return
+    if instance._stored_image != instance.image.name:
+        release_image_on_commit(instance._stored_image)
+    instance._stored_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image_on_commit(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def purge_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    tags = [post_tag(instance.id)]
+    if instance.group_id:
+        # Страницы, где пост был раньше, помечены его меткой; группу,
+        # куда он попал, нужно сбросить явно.
+        tags.append(group_tag(instance.group.slug))
+    if created:
+        tags += [author_tag(instance.author_id), FEED_TAG]
+    purge(*tags)
+
+
+@receiver(post_delete, sender=Post)
+def purge_deleted_post(sender, instance, **kwargs):
+    purge(post_tag(instance.id), author_tag(instance.author_id), FEED_TAG)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_commented_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge(post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge(author_tag(instance.user_id), author_tag(instance.author_id))
+
+
+@receiver(post_init, sender=Group)
+def remember_slug(sender, instance, **kwargs):
+    instance._stored_slug = instance.__dict__.get("slug")
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group(sender, instance, raw=False, **kwargs):
+    if not raw:
+        purge(group_tag(instance.slug), group_tag(instance._stored_slug))
+        instance._stored_slug = instance.slug
+
+
+@receiver(post_save, sender=get_user_model())
+def purge_author(sender, instance, raw=False, update_fields=None,
+                 **kwargs):
+    # Вход пользователя сохраняет только last_login: его не видно.
+    if raw or update_fields == frozenset(["last_login"]):
+        return
+    purge(author_tag(instance.pk))
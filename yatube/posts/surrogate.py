@@ -0,0 +1,45 @@
+import time
+
+from django.utils.functional import SimpleLazyObject
+
+from core.surrogate import note_read, note_tags, tag_versions
+
+FEED_TAG = "feed:index"
+
+
+def post_tag(post_id):
+    return f"post:{post_id}"
+
+
+def author_tag(author_id):
+    return f"author:{author_id}"
+
+
+def group_tag(slug):
+    return f"group:{slug}" if slug else None
+
+
+def page_tags(posts):
+    """Метки всего, что видно в карточках страницы."""
+    tags = []
+    for post in posts:
+        tags += [post_tag(post.id), author_tag(post.author_id)]
+        if post.group_id:
+            tags.append(group_tag(post.group.slug))
+    return tags
+
+
+def lazy_page(paginator, cursor, tags=()):
+    """
+    Страница, которая читается из базы при первом обращении — при
+    попадании в кеш фрагмента запроса нет. Для collect_tags
+    отмечаются версии меток tags, прочитанные до запроса, и метки
+    постов страницы — после него (см. note_read).
+    """
+    def load():
+        started = time.time()
+        note_tags(tag_versions(tags))
+        page = paginator.get_page(cursor)
+        note_read(page_tags(page), started)
+        return page
+    return SimpleLazyObject(load)
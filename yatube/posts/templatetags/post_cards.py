@@ -0,0 +1,14 @@
+from django import template
+
+from posts.cards import CARD_TEMPLATE, render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, template_name=CARD_TEMPLATE):
+    """
+    Карточки постов из кеша: {% post_cards page_obj as cards %},
+    затем {% for post, card in cards %}{{ card }}{% endfor %}.
+    """
+    return render_cards(posts, template_name)
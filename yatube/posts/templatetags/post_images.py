@@ -0,0 +1,43 @@
+import logging
+
+from django import template
+
+from posts.thumbnails import get_variants
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+# Ширина колонки с постом: во всю ширину экрана на телефоне,
+# не больше контейнера Bootstrap на десктопе.
+SIZES = "(min-width: 1200px) 1110px, 100vw"
+
+
+def srcset(thumbnails):
+    return ", ".join(
+        f"{im.url} {im.width}w" for im in thumbnails if im.size)
+
+
+@register.inclusion_tag("posts/includes/picture.html")
+def post_picture(post, sizes=SIZES):
+    """
+    <picture> с вариантами картинки поста: браузер выбирает формат
+    и ширину по srcset и sizes, а загружает картинку лениво.
+    """
+    if not post.image:
+        return {}
+    try:
+        variants = get_variants(post.image)
+    except Exception:
+        logger.exception("Не удалось получить миниатюры %s", post.image)
+        return {}
+    fallback = variants["JPEG"][len(variants["JPEG"]) // 2]
+    if not fallback.size:
+        # Исходник не читается: sorl вернул миниатюру без файла.
+        return {}
+    return {
+        "fallback": fallback,
+        "webp_srcset": srcset(variants.get("WEBP", ())),
+        "jpeg_srcset": srcset(variants["JPEG"]),
+        "sizes": sizes,
+    }
@@ -1,18 +1,31 @@
+import io
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
 
 from posts.models import Comment, Group, Post
+from posts.thumbnails import FORMATS, GEOMETRIES, generate_thumbnails
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateFormTests(TestCase):
@@ -76,7 +89,7 @@ class PostCreateFormTests(TestCase):
                 text=form_data['text'],
                 group=form_data['group'],
                 author=PostCreateFormTests.user,
-                image='posts/small.gif'
+                image__endswith='.gif'
             ).exists()
         )
 
@@ -129,3 +142,97 @@ class PostCreateFormTests(TestCase):
                 author=PostCreateFormTests.user,
             ).exists()
         )
+
+    def test_create_post_queues_thumbnails(self):
+        """Создание и правка поста ставят миниатюры в очередь."""
+        uploaded = SimpleUploadedFile(
+            name='queued.gif', content=SMALL_GIF, content_type='image/gif')
+        with mock.patch('posts.views.queue_thumbnails') as queue:
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Пост с картинкой', 'image': uploaded},
+            )
+            post = Post.objects.get(text='Пост с картинкой')
+            queue.assert_called_once_with(post)
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                data={'text': 'Правка'},
+            )
+            self.assertEqual(queue.call_count, 2)
+
+    def test_pregenerated_thumbnails_skip_decoding(self):
+        """После генерации шаблону не нужно декодировать картинку."""
+        post = Post.objects.create(
+            author=PostCreateFormTests.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='pregen.gif', content=SMALL_GIF,
+                content_type='image/gif'),
+        )
+        generate_thumbnails(post.image.name)
+        with mock.patch.object(
+                default.engine, 'get_image',
+                side_effect=AssertionError('картинка декодирована')):
+            for geometry, options in GEOMETRIES:
+                self.assertTrue(
+                    get_thumbnail(post.image, geometry, **options).url)
+
+    def upload(self, name, content):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Загрузка',
+                'image': SimpleUploadedFile(name=name, content=content),
+            },
+        )
+
+    @override_settings(UPLOAD_MAX_SIZE=16)
+    def test_too_large_upload_rejected(self):
+        """Файл больше UPLOAD_MAX_SIZE не сохраняется."""
+        post_count = Post.objects.count()
+        response = self.upload('large.gif', SMALL_GIF)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 16\xa0байт.')
+        self.assertEqual(Post.objects.count(), post_count)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Картинка с большим разрешением отклоняется до декодирования."""
+        content = io.BytesIO()
+        Image.new('RGB', (20, 20)).save(content, 'PNG')
+        response = self.upload('bomb.png', content.getvalue())
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое разрешение картинки.')
+
+    @override_settings(POST_IMAGE_MAX_SIDE=10)
+    def test_upload_rotated_downscaled_and_stripped(self):
+        """Картинка повёрнута по EXIF, уменьшена и сохранена без EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        content = io.BytesIO()
+        Image.new('RGB', (40, 20)).save(content, 'JPEG', exif=exif)
+        self.upload('photo.jpeg', content.getvalue())
+        post = Post.objects.get(text='Загрузка', image__endswith='.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (5, 10))
+            self.assertNotIn('exif', image.info)
+
+    def test_post_image_rendered_with_srcset(self):
+        """Картинка поста выводится с вариантами разной ширины."""
+        post = Post.objects.create(
+            author=PostCreateFormTests.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='srcset.gif', content=SMALL_GIF,
+                content_type='image/gif'),
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        content = response.content.decode()
+        self.assertIn('.jpg 480w', content)
+        self.assertIn('.jpg 1440w', content)
+        if 'WEBP' in FORMATS:
+            self.assertIn('<source type="image/webp" srcset="', content)
+            self.assertIn('.webp 480w', content)
+        self.assertIn('loading="lazy"', content)
@@ -1,7 +1,25 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.tests.utils import run_on_commit
+from core.writes import write
 
-from ..models import Group, Post
+from ..counters import get_stats, reconcile_posts, reconcile_users
+from ..forms import PostForm
+from ..media import release_image
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -55,3 +73,159 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        get_stats(CountersTest.user)
+        get_stats(CountersTest.reader)
+        post = Post.objects.create(author=CountersTest.user, text='Пост')
+        Post.objects.create(author=CountersTest.user, text='Ещё пост')
+        comment = Comment.objects.create(
+            post=post, author=CountersTest.reader, text='Комментарий')
+        Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.user)
+        stats = get_stats(CountersTest.user)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(get_stats(CountersTest.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        Follow.objects.all().delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(get_stats(CountersTest.reader).following_count, 0)
+
+    def test_edit_keeps_comments_count(self):
+        """
+        Правка поста, открытого до нового комментария, не возвращает
+        старое число комментариев.
+        """
+        post = Post.objects.create(author=CountersTest.user, text='Пост')
+        stale = Post.objects.get(pk=post.pk)
+        Comment.objects.create(
+            post=post, author=CountersTest.reader, text='Комментарий')
+        form = PostForm({'text': 'Исправленный пост'}, instance=stale)
+        self.assertTrue(form.is_valid())
+        form.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_reconcile_fixes_drift(self):
+        """Пересчёт исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(author=CountersTest.user, text='Пост')
+        Comment.objects.create(
+            post=post, author=CountersTest.reader, text='Комментарий')
+        get_stats(CountersTest.user)
+        UserStats.objects.update(posts_count=42)
+        Post.objects.update(comments_count=7)
+        self.assertGreaterEqual(reconcile_users(batch_size=1), 1)
+        self.assertEqual(reconcile_posts(batch_size=1), 1)
+        self.assertEqual(get_stats(CountersTest.user).posts_count, 1)
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).comments_count, 1)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='media')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=MediaStorageTest.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name=name, content=SMALL_GIF),
+        )
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с именем-хешем."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(first.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+
+    def test_image_released_with_last_reference(self):
+        """Файл удаляется, только когда на него не ссылается ни один пост."""
+        first = self.create_post()
+        second = self.create_post()
+        storage = first.image.storage
+        name = first.image.name
+        first.delete()
+        self.assertFalse(release_image(name))
+        self.assertTrue(storage.exists(name))
+        second.delete()
+        self.assertTrue(release_image(name))
+        self.assertFalse(storage.exists(name))
+
+    def test_reuploaded_image_kept(self):
+        """
+        Повторная загрузка обновляет время файла: только что снова
+        загруженная картинка не удаляется при освобождении.
+        """
+        first = self.create_post()
+        storage = first.image.storage
+        name = first.image.name
+        old = time.time() - 3600
+        os.utime(storage.path(name), (old, old))
+        second = self.create_post()
+        self.assertGreater(os.path.getmtime(storage.path(name)), old)
+        first.delete()
+        second.delete()
+        self.assertFalse(release_image(name, min_age=60))
+        self.assertTrue(storage.exists(name))
+
+    def test_release_rechecked_by_writer(self):
+        """Ссылки пересчитываются после фиксации, через писателя."""
+        post = self.create_post()
+        storage = post.image.storage
+        name = post.image.name
+        old = time.time() - 3600
+        os.utime(storage.path(name), (old, old))
+        with mock.patch('posts.media.write', wraps=write) as writer:
+            with run_on_commit():
+                post.delete()
+                writer.assert_not_called()
+                self.assertTrue(storage.exists(name))
+        writer.assert_called_once()
+        self.assertFalse(storage.exists(name))
+
+    def test_collect_media_removes_orphans(self):
+        """collect_media удаляет только файлы без ссылок."""
+        post = self.create_post()
+        storage = post.image.storage
+        orphan = storage.save('posts/orphan.gif', ContentFile(b'orphan'))
+        call_command('collect_media', min_age=0, stdout=io.StringIO())
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(post.image.name))
@@ -1,21 +1,40 @@
+import gzip
 import shutil
 import tempfile
 from datetime import timedelta
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
-from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from sorl.thumbnail import default
 
-from posts.models import Comment, Follow, Group, Post
+from core.paginator import CursorPaginator
+from core.surrogate import HEADER, purge, tag_versions
+from core.tests.utils import run_on_commit
+from posts import views
+from posts.counters import get_stats
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.thumbnails import generate_thumbnails
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostsPagesTests(TestCase):
@@ -58,6 +77,9 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        # Фрагменты ленты сбрасываются метками после фиксации, а тесты
+        # откатываются без неё: чужой закешированный фрагмент остался бы.
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostsPagesTests.user)
 
@@ -283,6 +305,11 @@ class PostsPagesTests(TestCase):
         self.assertEqual(response.context['comments'][0].text, comment.text)
 
     def test_index_page_cache(self):
+        """
+        Главная страница кешируется до изменения постов: запись без
+        сигналов не видна, а сохранение и удаление поста сразу
+        сбрасывают кеш.
+        """
         new_post = Post.objects.create(
             text='Новый Пост для проверки кеша',
             author=PostsPagesTests.user,
@@ -293,16 +320,75 @@ class PostsPagesTests(TestCase):
         response = self.authorized_client.get(reverse('posts:index'))
         self.compare_two_posts(
             new_post, response.context['page_obj'].object_list[0])
-        new_post.delete()
+        Post.objects.filter(id=new_post.id).update(text='Без сигнала')
+        response_cached = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.content, response_cached.content)
+        with run_on_commit():
+            new_post.delete()
         response_afther_del_new_post = self.authorized_client.get(
             reverse('posts:index'))
-        self.assertEqual(
+        self.assertNotEqual(
             response.content, response_afther_del_new_post.content)
-        cache.clear()
-        response_afther_clear_cache = self.authorized_client.get(
-            reverse('posts:index'))
-        self.assertNotEquals(
-            response_afther_clear_cache, response_afther_del_new_post.content)
+        self.assertNotContains(
+            response_afther_del_new_post, 'Новый Пост для проверки кеша')
+
+    def test_index_fragment_hit_skips_page_query(self):
+        """
+        Попадание во фрагмент ленты не читает страницу из базы, но
+        отдаёт метки её постов; некорректный курсор — та же первая
+        страница. Правка поста сбрасывает фрагмент по его метке.
+        """
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url)
+        post = first.context['page_obj'][0]
+        for params in ({}, {'cursor': 'garbage'}):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(url, params)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'FROM "posts_post"' in query['sql']
+                ])
+                self.assertEqual(response.content, first.content)
+                self.assertIn(
+                    f'post:{post.id}', response[HEADER].split())
+        post.text = 'Правка без смены страницы'
+        with run_on_commit():
+            post.save()
+        self.assertContains(
+            self.authorized_client.get(url), 'Правка без смены страницы')
+
+    def test_index_fragment_purged_during_query_not_stored(self):
+        """
+        Фрагмент ленты, метку поста которого сбросили во время запроса,
+        не сохраняется: следующий запрос снова читает страницу.
+        """
+        url = reverse('posts:index')
+        get_page = CursorPaginator.get_page
+
+        def get_page_and_purge(paginator, cursor):
+            page = get_page(paginator, cursor)
+            purge(f'post:{page[0].id}')
+            return page
+
+        with mock.patch.object(
+                CursorPaginator, 'get_page', get_page_and_purge):
+            self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        self.assertTrue([
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        ])
+
+    def test_index_page_cache_depends_on_cursor(self):
+        """Каждая страница ленты кешируется отдельно."""
+        first = self.authorized_client.get(reverse('posts:index'))
+        cursor = first.context['page_obj'].paginator.next_cursor
+        second = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': cursor})
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, second.context['page_obj'][0].text)
 
     def test_follow_authorized_client(self):
         """
@@ -355,7 +441,35 @@ class PostsPagesTests(TestCase):
             new_post)
         self.authorized_client.force_login(PostsPagesTests.second_another_user)
         response = self.authorized_client.get(reverse('posts:follow_index'))
-        self.assertFalse(response.context['page_obj'].object_list.exists())
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_timeline_follows_subscriptions(self):
+        """
+        Лента подписок заполняется при подписке и публикации
+        и очищается при отписке.
+        """
+        Follow.objects.create(
+            user=PostsPagesTests.user,
+            author=PostsPagesTests.another_user)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=PostsPagesTests.user).count(),
+            PostsPagesTests.another_user.posts.count())
+        new_post = Post.objects.create(
+            text='Свежий пост автора',
+            author=PostsPagesTests.another_user,
+        )
+        new_post.pub_date = Post.objects.first().pub_date + timedelta(days=1)
+        new_post.save()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.compare_two_posts(
+            response.context['page_obj'].object_list[0], new_post)
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': PostsPagesTests.another_user.username})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=PostsPagesTests.user).exists())
 
 
 class PaginatorViewsTest(TestCase):
@@ -425,8 +539,742 @@ class PaginatorViewsTest(TestCase):
                 kwargs={'username': PaginatorViewsTest.user.username}),
         ]
         for address in list_address:
-            response = self.authorized_client.get(address + '?page=2')
+            response = self.authorized_client.get(address)
+            cursor = response.context['page_obj'].paginator.next_cursor
+            response = self.authorized_client.get(
+                address, {'cursor': cursor})
+            page_obj = response.context['page_obj']
             self.assertEqual(
-                len(response.context['page_obj']),
+                len(page_obj),
                 Post.objects.count() % settings.POST_COUNT
             )
+            self.assertEqual(page_obj.number, 2)
+            self.assertFalse(page_obj.has_next())
+
+    def test_cursor_pages_cover_all_posts_once(self):
+        """
+        Переход вперёд и назад по курсорам не теряет и не дублирует
+        посты и не выполняет COUNT(*).
+        """
+        address = reverse('posts:index')
+        first = self.authorized_client.get(address).context['page_obj']
+        cursor = first.paginator.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            second = self.authorized_client.get(
+                address, {'cursor': cursor}).context['page_obj']
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+        ids = [post.id for post in first] + [post.id for post in second]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-id')
+                      .values_list('id', flat=True)))
+        back = self.authorized_client.get(
+            address, {'cursor': second.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first])
+        self.assertFalse(back.has_previous())
+
+    def test_cursor_links_drop_foreign_params(self):
+        """
+        Посторонние параметры не попадают в ссылки пагинатора, которые
+        кешируются вместе с фрагментом ленты.
+        """
+        cache.clear()
+        address = reverse('posts:index')
+        self.client.get(address, {'utm_source': 'evil'})
+        response = self.client.get(address)
+        self.assertNotContains(response, 'utm_source')
+        self.assertContains(response, '?cursor=')
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор отдаёт первую страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(
+            len(response.context['page_obj']), settings.POST_COUNT)
+
+
+class FollowFeedEnginesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}')
+            for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+        for i in range(25):
+            Post.objects.create(author=cls.authors[i % 3], text=f'Пост {i}')
+        Post.objects.create(
+            author=User.objects.create_user(username='Stranger'),
+            text='Чужой пост',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FollowFeedEnginesTest.user)
+
+    def collect_feed(self):
+        ids, cursor = [], None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            response = self.authorized_client.get(
+                reverse('posts:follow_index'), params)
+            page_obj = response.context['page_obj']
+            ids.extend(post.id for post in page_obj)
+            cursor = page_obj.paginator.next_cursor
+            if cursor is None:
+                return ids
+
+    def test_engines_return_same_feed(self):
+        """
+        Слияние списков авторов отдаёт ту же ленту, что и JOIN-запрос,
+        в том числе за горизонтом закешированных списков.
+        """
+        expected = list(
+            Post.objects.filter(author__following__user=self.user)
+            .order_by('-pub_date', '-id').values_list('id', flat=True)
+        )
+        for engine, size in (('timeline', 100), ('merge', 100),
+                             ('merge', 4)):
+            with self.subTest(engine=engine, size=size):
+                with override_settings(
+                        FOLLOW_FEED_ENGINE=engine, AUTHOR_FEED_SIZE=size):
+                    cache.clear()
+                    self.assertEqual(self.collect_feed(), expected)
+
+    @override_settings(FOLLOW_FEED_ENGINE='merge', AUTHOR_FEED_SIZE=4)
+    def test_merge_engine_deep_page_single_query(self):
+        """За горизонтом посты всех авторов читаются одним запросом."""
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        cursor = response.context['page_obj'].paginator.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(
+                reverse('posts:follow_index'), {'cursor': cursor})
+        posts_queries = [
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+            and '"posts_post"."author_id"' in query['sql']
+        ]
+        self.assertEqual(len(posts_queries), 1, posts_queries)
+
+    @override_settings(FOLLOW_FEED_ENGINE='merge')
+    def test_merge_engine_sees_new_posts(self):
+        """Новый пост автора сбрасывает его список и попадает в ленту."""
+        self.collect_feed()
+        with run_on_commit():
+            new_post = Post.objects.create(
+                author=FollowFeedEnginesTest.authors[0], text='Новый пост')
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0].id, new_post.id)
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug-group',
+            description='Тестовое описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(2 * settings.POST_COUNT + 1):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+        for i in range(settings.POST_COUNT):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+        get_stats(cls.author)
+        get_stats(cls.reader)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryBudgetTest.reader)
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTest.author)
+
+    def count_queries(self, client, method, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            getattr(client, method)(url, data)
+        return len(queries)
+
+    def assert_within_budget(self, url, used):
+        budget = resolve(url.split('?')[0]).func.query_budget
+        self.assertLessEqual(
+            used, budget, f'{url}: {used} запросов при бюджете {budget}')
+
+    def test_pages_fit_budget_for_any_page_size(self):
+        """
+        Число запросов страниц не зависит от размера страницы
+        и укладывается в объявленный бюджет.
+        """
+        post = QueryBudgetTest.post
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=Пост',
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                used = []
+                for page_size in (2, settings.POST_COUNT):
+                    with override_settings(
+                            POST_COUNT=page_size, COMMENT_COUNT=page_size):
+                        used.append(self.count_queries(
+                            self.reader_client, 'get', url))
+                self.assertEqual(used[0], used[1])
+                self.assert_within_budget(url, used[1])
+
+    def test_actions_fit_budget(self):
+        """Действия пользователя укладываются в объявленный бюджет."""
+        post = QueryBudgetTest.post
+        username = QueryBudgetTest.author.username
+        actions = [
+            (self.reader_client, 'post',
+             reverse('posts:add_comment', kwargs={'post_id': post.id}),
+             {'text': 'Ещё комментарий'}),
+            (self.reader_client, 'get',
+             reverse('posts:profile_unfollow',
+                     kwargs={'username': username}), None),
+            (self.reader_client, 'get',
+             reverse('posts:profile_follow',
+                     kwargs={'username': username}), None),
+            (self.author_client, 'post',
+             reverse('posts:post_create'), {'text': 'Новый пост'}),
+            (self.author_client, 'post',
+             reverse('posts:post_edit', kwargs={'post_id': post.id}),
+             {'text': 'Изменённый пост'}),
+        ]
+        for client, method, url, data in actions:
+            with self.subTest(url=url):
+                used = self.count_queries(client, method, url, data)
+                self.assert_within_budget(url, used)
+
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+    def test_feed_page_reads_thumbnails_in_one_batch(self):
+        """Миниатюры страницы ленты читаются одним запросом к KV."""
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, ignore_errors=True)
+        for i in range(3):
+            post = Post.objects.create(
+                author=QueryBudgetTest.author,
+                text=f'Пост с картинкой {i}',
+                image=SimpleUploadedFile(
+                    name=f'batch{i}.gif', content=SMALL_GIF,
+                    content_type='image/gif'),
+            )
+            generate_thumbnails(post.image.name)
+        cache.clear()
+        with mock.patch.object(
+                default.engine, 'get_image',
+                side_effect=AssertionError('картинка декодирована')):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.reader_client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+
+
+class QueryPlanTest(TestCase):
+    """Запросы лент идут по индексам: без полного скана и сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug-group',
+            description='Тестовое описание группы',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(2 * settings.POST_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+        get_stats(cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryPlanTest.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url, params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url, params)
+        for query in queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            for step in self.explain(query['sql']):
+                self.assertNotIn('TEMP B-TREE', step, query['sql'])
+                if step.startswith('SCAN'):
+                    self.assertIn('USING', step, query['sql'])
+                    self.assertFalse(params, f'{step}: {query["sql"]}')
+
+    def test_feed_queries_use_indexes(self):
+        """
+        Первая страница читает индекс по порядку, страница по курсору
+        начинает с позиции (SEARCH), временных B-деревьев нет.
+        """
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+        ]
+        for engine in ('timeline', 'merge'):
+            with override_settings(FOLLOW_FEED_ENGINE=engine,
+                                   AUTHOR_FEED_SIZE=2):
+                for url in urls:
+                    with self.subTest(engine=engine, url=url):
+                        self.assert_indexed(url, {})
+                        response = self.authorized_client.get(url)
+                        cursor = response.context[
+                            'page_obj'].paginator.next_cursor
+                        self.assert_indexed(url, {'cursor': cursor})
+
+    def test_post_detail_queries_use_indexes(self):
+        """Пост и его комментарии читаются по индексам."""
+        self.assert_indexed(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': QueryPlanTest.post.id}), {})
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='IvanIvanov')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=text)
+            for text in (
+                'Утренняя прогулка по набережной',
+                'Прогулка, прогулка и снова прогулка',
+                'Рецепт борща',
+            )
+        ]
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_search_ranks_matches(self):
+        """Поиск находит посты по словам и префиксам, лучшие — первыми."""
+        page_obj = self.search('прогулк')
+        self.assertEqual(
+            [post.id for post in page_obj],
+            [self.posts[1].id, self.posts[0].id])
+        self.assertEqual(len(self.search('БОРЩ')), 1)
+        self.assertEqual(len(self.search('пельмени')), 0)
+        self.assertEqual(len(self.search('  ')), 0)
+
+    def test_search_index_follows_edits(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        # Своя копия: объект класса после delete() остался бы без pk.
+        post = Post.objects.get(pk=self.posts[2].pk)
+        post.text = 'Рецепт пельменей'
+        post.save()
+        self.assertEqual(len(self.search('борщ')), 0)
+        self.assertEqual(self.search('пельмен')[0].id, post.id)
+        post.delete()
+        self.assertEqual(len(self.search('пельмен')), 0)
+
+    def test_search_pages_keep_query(self):
+        """Страницы результатов листаются курсором с сохранением запроса."""
+        for i in range(settings.POST_COUNT):
+            Post.objects.create(author=self.user, text=f'Прогулка номер {i}')
+        first = self.search('прогулка')
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'прогулка'})
+        self.assertContains(response, 'q=%D0%BF%D1%80%D0%BE')
+        second = self.search(
+            'прогулка', cursor=first.paginator.next_cursor)
+        self.assertEqual(len(first) + len(second), settings.POST_COUNT + 2)
+        self.assertFalse(
+            {post.id for post in first} & {post.id for post in second})
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'борщ'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.posts[2]])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTest.reader)
+        self.urls = (
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:group_list', args=[self.group.slug]),
+        )
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменившаяся страница отвечает 304 без основных запросов."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Первый ответ выставляет cookie CSRF — часть ETag.
+                self.reader_client.get(url)
+                etag = self.reader_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.reader_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertLessEqual(len(queries), 3)
+
+    def test_changes_invalidate_etag(self):
+        """Комментарий, подписка и правка поста меняют ETag."""
+        changes = (
+            (self.urls[0], lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            (self.urls[1], lambda: Follow.objects.create(
+                user=self.reader, author=self.author)),
+            (self.urls[2], lambda: Post.objects.filter(pk=self.post.pk)
+                .first().save()),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                with run_on_commit():
+                    change()
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_author_name_changes_etag(self):
+        """Имя автора видно в карточках — его смена меняет ETag."""
+        etags = {}
+        for url in self.urls:
+            self.reader_client.get(url)
+            etags[url] = self.reader_client.get(url)['ETag']
+        self.author.first_name = 'Новое имя'
+        with run_on_commit():
+            self.author.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новое имя')
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+
+    def test_viewer_is_part_of_etag(self):
+        """Другой пользователь не получает чужую страницу по ETag."""
+        url = self.urls[0]
+        etag = self.reader_client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_control(self):
+        """Анонимные страницы публичные, страницы пользователя — приватные."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                anonymous = self.client.get(url)['Cache-Control']
+                self.assertIn('public', anonymous)
+                self.assertIn(
+                    f'max-age={settings.ANONYMOUS_CACHE_MAX_AGE}', anonymous)
+                private = self.reader_client.get(url)['Cache-Control']
+                self.assertIn('private', private)
+                self.assertIn('no-cache', private)
+
+
+class SurrogateKeyTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='tagged')
+        cls.reader = User.objects.create_user(username='tag_reader')
+        cls.group = Group.objects.create(title='Метки', slug='tags')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_carry_surrogate_keys(self):
+        post_tags = {f'post:{self.post.id}', f'author:{self.author.id}',
+                     'group:tags'}
+        pages = {
+            reverse('posts:index'): post_tags | {'feed:index'},
+            reverse('posts:group_list', args=['tags']): post_tags,
+            reverse('posts:profile', args=[self.author.username]):
+                post_tags,
+            reverse('posts:post_detail', args=[self.post.id]): post_tags,
+        }
+        for url, tags in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    set(response['Surrogate-Key'].split()), tags)
+
+    def test_changes_purge_their_tags(self):
+        """Сигналы сбрасывают метки того, что изменилось."""
+        post_tag = f'post:{self.post.id}'
+        author_tag = f'author:{self.author.id}'
+        tags = [post_tag, author_tag, 'group:tags', 'feed:index']
+        changes = (
+            (lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'),
+             {post_tag}),
+            (lambda: Follow.objects.create(
+                user=self.reader, author=self.author),
+             {author_tag}),
+            (lambda: Post.objects.get(pk=self.post.pk).save(),
+             {post_tag, 'group:tags'}),
+            (lambda: Post.objects.create(author=self.author, text='Ещё'),
+             {author_tag, 'feed:index'}),
+            (lambda: Group.objects.get(pk=self.group.pk).save(),
+             {'group:tags'}),
+        )
+        for change, purged in changes:
+            with self.subTest(purged=purged):
+                before = tag_versions(tags)
+                with run_on_commit():
+                    change()
+                    # До фиксации метки прежние.
+                    self.assertEqual(tag_versions(tags), before)
+                after = tag_versions(tags)
+                self.assertEqual(
+                    {tag for tag in tags if before[tag] != after[tag]},
+                    purged)
+
+
+@override_settings(COMMENT_COUNT=4)
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_rendered_inline(self):
+        """На странице поста только первая страница новых комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.id for comment in comments],
+            [comment.id for comment in self.comments[::-1][:4]])
+        self.assertContains(response, 'data-comments-url')
+
+    def test_fragment_pages_cover_all_comments_once(self):
+        """Фрагменты по курсору отдают остальные комментарии без дублей."""
+        url = reverse('posts:post_comments', args=[self.post.id])
+        response = self.client.get(url)
+        self.assertNotContains(response, '<html')
+        seen = []
+        while True:
+            comments = response.context['comments']
+            seen.extend(comment.id for comment in comments)
+            if not comments.has_next():
+                break
+            response = self.client.get(
+                url, {'cursor': comments.paginator.next_cursor})
+        self.assertEqual(
+            seen, [comment.id for comment in self.comments[::-1]])
+        self.assertNotContains(response, 'data-comments-url')
+
+    def test_fragment_for_missing_post(self):
+        """Фрагмент комментариев несуществующего поста — 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.id + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(POST_COUNT=2)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='card_author')
+        cls.group = Group.objects.create(title='Карточки', slug='cards')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Карточка {i}')
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_reused_until_post_saved(self):
+        """Карточка берётся из кеша, пока пост не сохранят заново."""
+        post = self.posts[-1]
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(url)
+        Post.objects.filter(id=post.id).update(text='Без сигнала')
+        self.assertContains(self.client.get(url), 'Карточка 3')
+        post.text = 'Новый текст'
+        with run_on_commit():
+            post.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Карточка 3')
+
+    def test_edit_invalidates_only_pages_with_post(self):
+        """Правка поста перерисовывает только его страницу ленты."""
+        url = reverse('posts:index')
+        first = self.client.get(url)
+        cursor = first.context['page_obj'].paginator.next_cursor
+        self.client.get(url, {'cursor': cursor})
+        Post.objects.filter(id=self.posts[0].id).update(text='Скрыто')
+        edited = self.posts[-1]
+        edited.text = 'Правка'
+        with run_on_commit():
+            edited.save()
+        self.assertContains(self.client.get(url), 'Правка')
+        second = self.client.get(url, {'cursor': cursor})
+        self.assertContains(second, 'Карточка 0')
+        self.assertNotContains(second, 'Скрыто')
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.group = Group.objects.create(title='Кеш', slug='page-cache')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост из кеша страниц', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+
+    def test_repeated_request_served_without_queries(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                self.assertEqual(first['X-Page-Cache'], 'miss')
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second['X-Page-Cache'], 'hit')
+                self.assertEqual(first.content, second.content)
+
+    def test_query_string_limited_to_known_params(self):
+        """
+        Страница кешируется только с курсором, а с посторонним или
+        повторённым параметром — нет: ?page= страницы не читают.
+        """
+        url = self.urls[0]
+        self.client.get(url, {'cursor': ''})
+        response = self.client.get(f'{url}?cursor=')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        for query in ('utm=1', 'page=1', 'cursor=&cursor='):
+            with self.subTest(query=query):
+                response = self.client.get(f'{url}?{query}')
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_compressed_at_rest(self):
+        """Сжатое тело отдаётся как есть, если клиент принимает gzip."""
+        url = self.urls[0]
+        plain = self.client.get(url).content
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(self.client.get(url).content, plain)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response.content, plain)
+
+    def test_not_modified_from_cache(self):
+        url = self.urls[3]
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates_page(self):
+        """Комментарий сбрасывает закешированную страницу поста."""
+        url = self.urls[3]
+        self.client.get(url)
+        with run_on_commit():
+            Comment.objects.create(
+                post=self.post, author=self.author, text='Новый комментарий')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_purge_during_render_not_stored(self):
+        """
+        Страница, метку которой сбросили во время отрисовки, могла
+        прочитать старые данные: она не сохраняется.
+        """
+        url = self.urls[3]
+        render = views.render
+
+        def render_and_purge(*args, **kwargs):
+            response = render(*args, **kwargs)
+            purge(f'post:{self.post.id}')
+            return response
+
+        with mock.patch('posts.views.render', render_and_purge):
+            self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_users_bypass_cache(self):
+        """Пользователь с сессией всегда получает свою страницу."""
+        self.client.get(self.urls[0])
+        self.client.force_login(self.author)
+        response = self.client.get(self.urls[0])
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'Новая запись')
@@ -0,0 +1,140 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.db import connection, transaction
+from PIL import features
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .kvstore import thumbnail_key
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Варианты post.image для srcset: ширины с пропорциями 960x339,
+# каждая в WebP (если Pillow собран с libwebp) и в прогрессивном JPEG
+# для старых браузеров.
+WIDTHS = (480, 960, 1440)
+FORMATS = ("WEBP", "JPEG") if features.check("webp") else ("JPEG",)
+GEOMETRIES = tuple(
+    (f"{width}x{width * 339 // 960}",
+     {"crop": "center", "upscale": True, "format": image_format})
+    for image_format in FORMATS
+    for width in WIDTHS
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def wait_for_thumbnails():
+    """
+    Дожидается уже поставленных фоновых миниатюр: нужно тестам,
+    которые после запроса очищают базу и файлы.
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def source_image(name):
+    """
+    Картинка поста в хранилище поля Post.image: от хранилища зависят
+    ключи миниатюр, поэтому по имени их искать нельзя.
+    """
+    return ImageFile(name, Post._meta.get_field("image").storage)
+
+
+def generate_thumbnails(name):
+    """
+    Создаёт миниатюры картинки во всех размерах из GEOMETRIES.
+    Готовые миниатюры берутся из KV-хранилища sorl без декодирования.
+    """
+    source = source_image(name)
+    for geometry, options in GEOMETRIES:
+        get_thumbnail(source, geometry, **options)
+
+
+def _generate_in_background(name):
+    try:
+        generate_thumbnails(name)
+    except Exception:
+        logger.exception("Не удалось создать миниатюры для %s", name)
+    finally:
+        connection.close()
+
+
+def get_variants(image):
+    """Миниатюры картинки по форматам из FORMATS: {"JPEG": [...], ...}."""
+    variants = {image_format: [] for image_format in FORMATS}
+    for geometry, options in GEOMETRIES:
+        variants[options["format"]].append(
+            get_thumbnail(image, geometry, **options))
+    return variants
+
+
+def queue_thumbnails(post):
+    """
+    Ставит создание миниатюр поста в пул фоновых потоков после
+    фиксации транзакции, чтобы шаблоны находили их готовыми.
+    """
+    if not post.image:
+        return
+    name = post.image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_in_background, name))
+
+
+@contextmanager
+def prefetch_thumbnails(posts):
+    """
+    Заявляет ключи миниатюр всех постов страницы: шаблон получит их
+    одним пакетным чтением KV-хранилища вместо чтения на каждый пост.
+    """
+    kvstore = default.kvstore
+    if not hasattr(kvstore, "expect"):
+        yield
+        return
+    kvstore.expect(
+        thumbnail_key(post.image, geometry, options)
+        for post in posts if post.image
+        for geometry, options in GEOMETRIES
+    )
+    try:
+        yield
+    finally:
+        kvstore.forget()
+
+
+def init_worker():
+    django.setup()
+
+
+def rebuild_chunk(names, force=False):
+    """Пересоздаёт миниатюры пачки картинок в процессе-воркере."""
+    done = 0
+    try:
+        for name in names:
+            try:
+                if force:
+                    delete(source_image(name), delete_file=False)
+                generate_thumbnails(name)
+                done += 1
+            except Exception:
+                logger.exception("Не удалось создать миниатюры для %s", name)
+    finally:
+        connection.close()
+    return done
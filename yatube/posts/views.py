@@ -1,53 +1,83 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.cache_control import cache_for_anonymous
+from core.paginator import CursorPaginator
+from core.query_budget import query_budget
+from core.surrogate import collect_tags, tag_response
+from core.writes import write
+
+from .counters import get_stats
+from .etags import page_condition
+from .feeds import follow_paginator
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .search import SearchPaginator
+from .surrogate import (FEED_TAG, author_tag, group_tag, lazy_page,
+                        page_tags, post_tag)
+from .thumbnails import queue_thumbnails
+
+
+def comments_page(post_id, cursor):
+    """Страница комментариев поста, новые первыми."""
+    comment_list = Comment.objects.filter(
+        post_id=post_id).select_related("author")
+    paginator = CursorPaginator(
+        comment_list, settings.COMMENT_COUNT, ordering=("-created", "-id"))
+    return paginator.get_page(cursor)
 
 
+@query_budget(3)
 def index(request):
     template = "posts/index.html"
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related("author", "group")
 
-    paginator = Paginator(post_list, settings.POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, settings.POST_COUNT)
+    cursor = request.GET.get("cursor")
 
     context = {
-        "page_obj": page_obj,
+        "page_obj": lazy_page(paginator, cursor, [FEED_TAG]),
+        "position": paginator.position(cursor),
         "index": True,
         "follow": False,
+        "feed_cache_timeout": settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, template, context)
+    with collect_tags() as tags:
+        response = render(request, template, context)
+    return tag_response(response, FEED_TAG, *tags)
 
 
+@query_budget(4)
+@cache_for_anonymous
+@page_condition
 def group_posts(request, slug):
     template = "posts/group_list.html"
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.group_posts.all()
+    post_list = group.group_posts.select_related("author")
 
-    paginator = Paginator(post_list, settings.POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, settings.POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     context = {
         "group": group,
         "page_obj": page_obj,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    return tag_response(response, group_tag(group.slug), *page_tags(page_obj))
 
 
+@query_budget(7)
+@cache_for_anonymous
+@page_condition
 def profile(request, username):
     template = "posts/profile.html"
     author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    count = post_list.count()
+    post_list = author.posts.select_related("group")
+    stats = get_stats(author)
 
-    paginator = Paginator(post_list, settings.POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, settings.POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     following = request.user.is_authenticated and (
         Follow.objects.filter(user=request.user, author=author).exists()
@@ -55,20 +85,25 @@ def profile(request, username):
 
     context = {
         "author": author,
-        "count": count,
+        "count": stats.posts_count,
+        "stats": stats,
         "page_obj": page_obj,
         "following": following,
     }
-    return render(request, template, context)
+    response = render(request, template, context)
+    return tag_response(response, author_tag(author.id), *page_tags(page_obj))
 
 
+@query_budget(6)
+@cache_for_anonymous
+@page_condition
 def post_detail(request, post_id):
     template = "posts/post_detail.html"
-    post = get_object_or_404(Post, id=post_id)
-    author = post.author
-    count = author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group"), id=post_id)
+    count = get_stats(post.author).posts_count
     form = CommentForm()
-    comments = post.comments.all()
+    comments = comments_page(post.id, request.GET.get("cursor"))
 
     context = {
         "count": count,
@@ -76,10 +111,39 @@ def post_detail(request, post_id):
         "form": form,
         "comments": comments,
     }
+    response = render(request, template, context)
+    return tag_response(response, *page_tags([post]))
+
+
+@query_budget(4)
+def post_comments(request, post_id):
+    template = "posts/includes/comment_list.html"
+    post = get_object_or_404(Post.objects.only("id"), id=post_id)
+    context = {
+        "post": post,
+        "comments": comments_page(post.id, request.GET.get("cursor")),
+    }
+    response = render(request, template, context)
+    return tag_response(response, post_tag(post.id))
+
+
+@query_budget(4)
+def search(request):
+    template = "posts/search.html"
+    query = request.GET.get("q", "").strip()
+
+    paginator = SearchPaginator(query, settings.POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
+
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+    }
     return render(request, template, context)
 
 
 @login_required
+@query_budget(6)
 def post_create(request):
     template = "posts/create_post.html"
     form = PostForm(
@@ -89,7 +153,8 @@ def post_create(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        write(new_post.save)
+        queue_thumbnails(new_post)
         return redirect("posts:profile",
                         username=request.user.username)
 
@@ -98,6 +163,7 @@ def post_create(request):
 
 
 @login_required
+@query_budget(6)
 def post_edit(request, post_id):
     template = "posts/create_post.html"
     post = get_object_or_404(Post, id=post_id)
@@ -117,7 +183,8 @@ def post_edit(request, post_id):
     }
 
     if form.is_valid():
-        form.save()
+        post = write(form.save)
+        queue_thumbnails(post)
         return redirect("posts:post_detail",
                         post_id=post.id)
 
@@ -125,6 +192,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@query_budget(5)
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -132,19 +200,16 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@query_budget(5)
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(
-        author__following__user=request.user)
-
-    paginator = Paginator(post_list, settings.POST_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    paginator = follow_paginator(request.user, settings.POST_COUNT)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     context = {
         "page_obj": page_obj,
@@ -155,18 +220,21 @@ def follow_index(request):
 
 
 @login_required
+@query_budget(13)
 def profile_follow(request, username):
     follower = request.user
     following = get_object_or_404(User, username=username)
     if follower != following:
-        Follow.objects.get_or_create(user=follower, author=following)
+        write(Follow.objects.get_or_create,
+              user=follower, author=following)
     return redirect("posts:profile", username=username)
 
 
 @login_required
+@query_budget(10)
 def profile_unfollow(request, username):
     unfollower = request.user
     following = get_object_or_404(User, username=username)
     relation = Follow.objects.filter(user=unfollower, author=following)
-    relation.delete()
+    write(relation.delete)
     return redirect("posts:profile", username=username)
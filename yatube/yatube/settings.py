@@ -36,6 +36,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
     "posts.apps.PostsConfig",
     "core.apps.CoreConfig",
     "users.apps.UsersConfig",
@@ -50,12 +51,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.page_cache.AnonymousPageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.writes.WriteOverloadMiddleware",
 ]
 
 ROOT_URLCONF = "yatube.urls"
@@ -88,9 +91,34 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Соединение переживает запрос; оборванное Django закрывает
+        # в начале и в конце запроса (close_old_connections).
+        "CONN_MAX_AGE": 60,
     }
 }
 
+# Выполняются для каждого нового соединения с SQLite (core.db).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+}
+
+# Все записи процесса идут через один поток-писатель (core.writes).
+WRITE_COORDINATOR = True
+WRITE_QUEUE_SIZE = 1000
+WRITE_QUEUE_TIMEOUT = 5
+WRITE_RESULT_TIMEOUT = 10
+WRITE_RETRY_AFTER = 5
+WRITE_BATCH_SIZE = 32
+WRITE_RETRIES = 5
+WRITE_RETRY_BACKOFF = 0.01
+
+SESSION_ENGINE = "core.sessions"
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,6 +177,11 @@ STATIC_URL = "/static/"
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
+STATIC_ROOT = os.path.join(BASE_DIR, "collected_static")
+
+# collectstatic добавляет хеш содержимого в имена и пишет .gz-копии.
+STATICFILES_STORAGE = "core.storage.CompressedManifestStaticFilesStorage"
+
 
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
@@ -157,6 +190,42 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 POST_COUNT = 10
+COMMENT_COUNT = 20
+
+FEED_CACHE_TIMEOUT = 12 * 60 * 60
+POST_CARD_TIMEOUT = 24 * 60 * 60
+
+# Готовые страницы для анонимных читателей (core.page_cache): живут
+# долго, потому что сбрасываются сигналами по меткам Surrogate-Key.
+PAGE_CACHE_TIMEOUT = 12 * 60 * 60
+# Метки Surrogate-Key страницы, по версиям которых считается её ETag
+# (posts.etags.page_condition).
+ETAG_TAGS_TIMEOUT = 24 * 60 * 60
+PAGE_CACHE_VIEWS = (
+    "posts:index",
+    "posts:group_list",
+    "posts:profile",
+    "posts:post_detail",
+)
+# Параметры запроса, с которыми страница ещё кешируется: с любыми
+# другими ключей было бы сколько угодно.
+PAGE_CACHE_PARAMS = ("cursor",)
+
+# Защита от лавины промахов ({% swrcache %}, core.stampede): сколько
+# отдавать истёкший фрагмент, пока его пересчитывает один запрос.
+STAMPEDE_STALE_TIMEOUT = 5 * 60
+STAMPEDE_LOCK_TIMEOUT = 30
+STAMPEDE_WAIT = 2
+STAMPEDE_BETA = 1.0
+
+# Сколько секунд браузер и прокси могут отдавать анонимную страницу
+# без перепроверки ETag.
+ANONYMOUS_CACHE_MAX_AGE = 60
+
+# Движок ленты подписок: "timeline" — материализованная лента,
+# "merge" — слияние закешированных списков постов авторов.
+FOLLOW_FEED_ENGINE = "timeline"
+AUTHOR_FEED_SIZE = 100
 
 # if DEBUG:
 #     MIDDLEWARE += (
@@ -175,8 +244,34 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки пишутся на диск потоком и обрезаются на UPLOAD_MAX_SIZE.
+FILE_UPLOAD_HANDLERS = ['core.uploads.BoundedUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+# Освобождённая картинка моложе этого (её только что загрузили снова)
+# не удаляется сразу — её подберёт collect_media (posts.media).
+IMAGE_RELEASE_MIN_AGE = 60
+
+# Картинки постов больше POST_IMAGE_MAX_PIXELS не декодируются,
+# остальные уменьшаются до POST_IMAGE_MAX_SIDE по большей стороне.
+POST_IMAGE_MAX_PIXELS = 60 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 1920
+
+# Потоки, в которых создаются миниатюры новых картинок постов.
+THUMBNAIL_WORKERS = 2
+
+# Ключи миниатюр страницы читаются из KV-хранилища одним пакетом.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 60,
+            'SYNC_INTERVAL': 1,
+            'DATABASE': 'default',
+        },
     }
 }
@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import static_file
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
@@ -9,6 +11,16 @@ urlpatterns = [
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("api/v1/", include("api.urls", namespace="api")),
+]
+
+# Без DEBUG статику из STATIC_ROOT отдаёт приложение: сжатые копии
+# и вечный кеш для имён с хешем.
+urlpatterns += [
+    re_path(
+        r"^%s(?P<path>.*)$" % settings.STATIC_URL.lstrip("/"),
+        static_file,
+    ),
 ]
 
 if settings.DEBUG: